@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import json
+import platform
+from datetime import datetime
+
+from database import init_pool, close_pool, get_db
+from migrate import migrate
+from bench import seed as seeding
+from bench.run import QueryCounter, run
+from bench.replay import replay
+
+# python -m bench seed --users 1000 --habits 5 --years 2
+# python -m bench run --requests 2000 --concurrency 50 --out before.json
+# python -m bench replay --updates 5000 --concurrency 50 --mode polling
+# python -m bench reset
+#
+# Работает с DATABASE_URL — направь его на локальную базу, не на прод.
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("seed", help="заполнить базу синтетическими данными")
+    p.add_argument("--users", type=int, default=1000)
+    p.add_argument("--habits", type=int, default=5, help="привычек на пользователя")
+    p.add_argument("--years", type=float, default=1.0, help="глубина истории habit_logs")
+    p.add_argument("--density", type=float, default=0.6, help="доля дней с отметкой")
+    p.add_argument("--seed", type=int, default=1)
+
+    p = sub.add_parser("run", help="прогнать сценарии и вывести JSON")
+    p.add_argument("--requests", type=int, default=1000, help="запросов на сценарий")
+    p.add_argument("--concurrency", type=int, default=20)
+    p.add_argument("--out", help="файл для JSON-отчёта (по умолчанию stdout)")
+
+    p = sub.add_parser("replay", help="прогнать апдейты через bot.py и фейковый Bot API")
+    p.add_argument("--updates", type=int, default=1000, help="размер синтетического потока")
+    p.add_argument("--concurrency", type=int, default=20)
+    p.add_argument("--mode", choices=["direct", "polling"], default="direct")
+    p.add_argument("--file", help="NDJSON с записанными апдейтами вместо синтетики")
+    p.add_argument("--users", type=int, default=1000, help="сколько синтетических пользователей задействовать")
+    p.add_argument("--port", type=int, default=8081, help="порт фейкового Bot API")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", help="файл для JSON-отчёта (по умолчанию stdout)")
+
+    sub.add_parser("reset", help="удалить синтетических пользователей")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    counter = QueryCounter()
+    await init_pool(init=counter.attach)
+
+    try:
+        async with get_db() as db:
+            await migrate(db)
+
+        if args.command == "seed":
+            async with get_db() as db:
+                report = await seeding.seed(
+                    db, args.users, args.habits, args.years, args.density, args.seed
+                )
+        elif args.command == "reset":
+            async with get_db() as db:
+                await seeding.reset(db)
+            report = {"reset": True}
+        elif args.command == "replay":
+            report = await replay(
+                args.updates, args.concurrency, args.mode, args.file,
+                args.users, args.seed, args.port, counter=counter,
+            )
+            report["started_at"] = datetime.utcnow().isoformat(timespec="seconds")
+        else:
+            report = await run(args.requests, args.concurrency, counter)
+            report["started_at"] = datetime.utcnow().isoformat(timespec="seconds")
+            report["python"] = platform.python_version()
+    finally:
+        await close_pool()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if getattr(args, "out", None):
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
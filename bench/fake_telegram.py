@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, deque
+
+from aiohttp import web
+
+# Локальная замена Bot API для нагрузочных прогонов бота.
+# Отвечает на getUpdates из своей очереди, остальные методы
+# считает и возвращает правдоподобные объекты.
+#
+# python -m bench.fake_telegram --port 8081
+# TELEGRAM_API_URL=http://127.0.0.1:8081 python bot.py
+
+
+class Tracked:
+    __slots__ = ("kind", "delivered", "responded", "calls")
+
+    def __init__(self, kind, delivered):
+        self.kind = kind
+        self.delivered = delivered
+        self.responded = None
+        self.calls = 0
+
+
+class FakeTelegram:
+    def __init__(self):
+        self.calls = Counter()
+        self.updates = deque()
+        self.has_updates = asyncio.Event()
+        self.message_ids = itertools.count(1_000_000)
+        self.file_ids = itertools.count(1)
+
+        # какой апдейт породил исходящий вызов: по callback id,
+        # по (chat_id, message_id) для правок и по chat_id для новых сообщений
+        self.tracked = []
+        self.by_callback = {}
+        self.by_message = {}
+        self.by_chat = {}
+        self.all_responded = asyncio.Event()
+        self.pending = 0
+
+    # ---------- входящие апдейты ----------
+
+    def push(self, update, kind=None):
+        self.updates.append((update, kind))
+        self.has_updates.set()
+        self.all_responded.clear()
+
+    def track(self, update, kind=None):
+        item = Tracked(kind or update_kind(update), time.perf_counter())
+        self.tracked.append(item)
+        self.pending += 1
+        self.all_responded.clear()
+
+        callback = update.get("callback_query")
+        if callback:
+            self.by_callback[callback["id"]] = item
+            msg = callback.get("message")
+            if msg:
+                self.by_message[(msg["chat"]["id"], msg["message_id"])] = item
+        elif "message" in update:
+            chat_id = update["message"]["chat"]["id"]
+            self.by_chat.setdefault(chat_id, deque()).append(item)
+        return item
+
+    def _attribute(self, method, data):
+        item = None
+        if "callback_query_id" in data:
+            item = self.by_callback.get(data["callback_query_id"])
+        elif "chat_id" in data:
+            chat_id = int(data["chat_id"])
+            if "message_id" in data:
+                item = self.by_message.get((chat_id, int(data["message_id"])))
+            else:
+                queue = self.by_chat.get(chat_id)
+                if queue:
+                    # первый ответ — самому старому апдейту без ответа
+                    item = next((i for i in queue if i.responded is None), queue[-1])
+                    while len(queue) > 1 and queue[0].responded is not None:
+                        queue.popleft()
+
+        if item is None:
+            return
+        item.calls += 1
+        if item.responded is None:
+            item.responded = time.perf_counter()
+            self.pending -= 1
+            if not self.pending and not self.updates:
+                self.all_responded.set()
+
+    def reset_stats(self):
+        self.calls.clear()
+        self.tracked.clear()
+        self.by_callback.clear()
+        self.by_message.clear()
+        self.by_chat.clear()
+        self.pending = 0
+        self.all_responded.set()
+
+    # ---------- методы Bot API ----------
+
+    def message(self, data, **extra):
+        chat_id = int(data.get("chat_id", 0))
+        return {
+            "message_id": int(data.get("message_id") or next(self.message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "bench_bot"},
+            **extra,
+        }
+
+    async def get_updates(self, data):
+        timeout = float(data.get("timeout") or 0)
+        if not self.updates and timeout:
+            self.has_updates.clear()
+            try:
+                await asyncio.wait_for(self.has_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        limit = int(data.get("limit") or 100)
+        batch = []
+        while self.updates and len(batch) < limit:
+            update, kind = self.updates.popleft()
+            self.track(update, kind)
+            batch.append(update)
+        return batch
+
+    async def handle(self, request):
+        method = request.match_info["method"]
+        data = dict(await request.post())
+        if not data and request.can_read_body:
+            data = await request.json()
+
+        self.calls[method] += 1
+        self._attribute(method, data)
+
+        if method == "getUpdates":
+            result = await self.get_updates(data)
+        elif method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "bench_bot", "username": "bench_bot"}
+        elif method == "getWebhookInfo":
+            result = {"url": "", "has_custom_certificate": False, "pending_update_count": len(self.updates)}
+        elif method == "sendMessage":
+            result = self.message(data, text=data.get("text", ""))
+        elif method == "editMessageText":
+            result = self.message(data, text=data.get("text", ""))
+        elif method == "sendPhoto":
+            n = next(self.file_ids)
+            photo = [{"file_id": f"photo-{n}", "file_unique_id": f"u{n}", "width": 800, "height": 400}]
+            result = self.message(data, photo=photo, caption=data.get("caption", ""))
+        else:
+            # answerCallbackQuery, deleteWebhook и прочее
+            result = True
+
+        return web.json_response({"ok": True, "result": result})
+
+    def app(self):
+        app = web.Application(client_max_size=20 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        app.router.add_get("/bot{token}/{method}", self.handle)
+        return app
+
+
+def update_kind(update):
+    callback = update.get("callback_query")
+    if callback:
+        return callback.get("data", "").split(":")[0] or "callback"
+
+    text = (update.get("message") or {}).get("text") or ""
+    if text.startswith("/"):
+        return text.split()[0][1:]
+    return text or "other"
+
+
+async def start_server(fake, host="127.0.0.1", port=8081):
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
+
+
+async def serve(host, port):
+    fake = FakeTelegram()
+    runner = await start_server(fake, host, port)
+    print(f"fake Bot API on http://{host}:{port}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(json.dumps(dict(fake.calls), ensure_ascii=False))
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m bench.fake_telegram")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
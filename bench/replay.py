@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+
+from database import get_db
+from bench.fake_telegram import FakeTelegram, start_server, update_kind
+from bench.run import percentile
+from bench.seed import TELEGRAM_ID_BASE
+
+# Прогон апдейтов через Dispatcher из bot.py против bench/fake_telegram.py.
+#
+# direct  — dp.process_update() с N параллельными воркерами, латентность хендлера
+# polling — апдейты отдаются через getUpdates и идут через UpdateShards
+#           с N воркерами, как в проде; латентность — от выдачи апдейта
+#           до первого исходящего вызова по нему
+
+# доли типов апдейтов в синтетическом потоке
+MIX = {
+    "start": 0.05,
+    "add_prompt": 0.05,
+    "add": 0.10,
+    "list": 0.30,
+    "done": 0.35,
+    "page": 0.05,
+    "stats": 0.10,
+}
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "bench_bot"}
+
+
+def synthetic_updates(users, count, seed=1, mix=MIX):
+    # users: {telegram_id: [habit_id, ...]}
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    user_ids = list(users)
+    kinds, weights = zip(*mix.items())
+    now = int(time.time())
+
+    def message(tid, text):
+        n = next(ids)
+        msg = {
+            "message_id": n,
+            "date": now,
+            "chat": {"id": tid, "type": "private"},
+            "from": {"id": tid, "is_bot": False, "first_name": "bench"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": n, "message": msg}
+
+    def callback(tid, data):
+        n = next(ids)
+        return {
+            "update_id": n,
+            "callback_query": {
+                "id": f"cb{n}",
+                "from": {"id": tid, "is_bot": False, "first_name": "bench"},
+                "chat_instance": str(tid),
+                "data": data,
+                "message": {
+                    "message_id": n,
+                    "date": now,
+                    "chat": {"id": tid, "type": "private"},
+                    "from": BOT_USER,
+                    "text": "📋 Мои привычки",
+                },
+            },
+        }
+
+    result = []
+    for _ in range(count):
+        tid = rng.choice(user_ids)
+        kind = rng.choices(kinds, weights)[0]
+        habits = users[tid]
+
+        if kind == "done" and habits:
+            update = callback(tid, f"done:{rng.choice(habits)}:0")
+        elif kind == "page":
+            update = callback(tid, "page:0")
+        elif kind == "start":
+            update = message(tid, "/start")
+        elif kind == "add_prompt":
+            update = message(tid, "➕ Добавить привычку")
+        elif kind == "add":
+            update = message(tid, f"Привычка {rng.randrange(10_000)}")
+        elif kind == "stats":
+            update = message(tid, "📊 Статистика")
+        else:
+            kind = "list"
+            update = message(tid, "📋 Мои привычки")
+        result.append((update, kind))
+
+    return result
+
+
+def load_updates(path):
+    # NDJSON: по объекту Update на строку, как их отдаёт getUpdates
+    with open(path, encoding="utf-8") as f:
+        return [(u, update_kind(u)) for u in map(json.loads, f) if u]
+
+
+async def bench_users(limit):
+    async with get_db() as db:
+        rows = await db.fetch("""
+            SELECT u.telegram_id, array_remove(array_agg(h.id), NULL) AS habit_ids
+            FROM users u
+            LEFT JOIN habits h ON h.user_id = u.id AND h.is_active
+            WHERE u.telegram_id >= $1
+            GROUP BY u.telegram_id
+            ORDER BY u.telegram_id
+            LIMIT $2
+        """, TELEGRAM_ID_BASE, limit)
+
+    if not rows:
+        raise RuntimeError("no benchmark data, run `python -m bench seed` first")
+    return {r["telegram_id"]: list(r["habit_ids"]) for r in rows}
+
+
+async def replay_direct(dp, fake, updates, concurrency):
+    from aiogram import Bot, Dispatcher, types
+
+    Bot.set_current(dp.bot)
+    Dispatcher.set_current(dp)
+
+    latencies = defaultdict(list)
+    errors = Counter()
+    queue = iter(updates)
+
+    async def worker():
+        for update, kind in queue:
+            fake.track(update, kind)
+            start = time.perf_counter()
+            try:
+                await dp.process_update(types.Update.to_object(update))
+            except Exception as e:
+                print("REPLAY ERROR:", kind, e)
+                errors[kind] += 1
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, errors
+
+
+async def replay_polling(dp, fake, updates, concurrency, timeout):
+    from services.updates import UpdateShards, poll
+
+    for update, kind in updates:
+        fake.push(update, kind)
+
+    shards = UpdateShards(dp, workers=concurrency)
+    shards.start()
+    polling = asyncio.create_task(poll(shards, timeout=1))
+    try:
+        await asyncio.wait_for(fake.all_responded.wait(), timeout)
+    except asyncio.TimeoutError:
+        print(f"REPLAY: {fake.pending} updates without response after {timeout}s")
+    finally:
+        polling.cancel()
+        await asyncio.gather(polling, return_exceptions=True)
+        await shards.stop()
+
+    latencies = defaultdict(list)
+    for item in fake.tracked:
+        if item.responded is not None:
+            latencies[item.kind].append((item.responded - item.delivered) * 1000)
+    return latencies, Counter()
+
+
+def summary(name, values, errors, calls, concurrency):
+    values = sorted(values)
+    return {
+        "name": name,
+        "updates": len(values),
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "calls_per_update": calls / len(values) if values else None,
+    }
+
+
+async def replay(count=1000, concurrency=20, mode="direct", path=None, users=1000,
+                 seed=1, port=8081, timeout=300, counter=None):
+    fake = FakeTelegram()
+    runner = await start_server(fake, port=port)
+
+    # bot.py создаёт Bot при импорте — адрес сервера нужен раньше
+    os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{port}"
+    import bot
+    from services import charts
+
+    try:
+        if path:
+            updates = load_updates(path)
+        else:
+            updates = synthetic_updates(await bench_users(users), count, seed)
+
+        fake.reset_stats()
+        queries_before = counter.count if counter else 0
+        started = time.perf_counter()
+
+        if mode == "polling":
+            latencies, errors = await replay_polling(bot.dp, fake, updates, concurrency, timeout)
+        else:
+            latencies, errors = await replay_direct(bot.dp, fake, updates, concurrency)
+
+        elapsed = time.perf_counter() - started
+    finally:
+        session = await bot.bot.get_session()
+        await session.close()
+        charts.shutdown()
+        await runner.cleanup()
+
+    calls_by_kind = Counter()
+    for item in fake.tracked:
+        calls_by_kind[item.kind] += item.calls
+
+    results = [
+        summary(kind, values, errors[kind], calls_by_kind[kind], concurrency)
+        for kind, values in sorted(latencies.items())
+    ]
+    outbound = {m: n for m, n in fake.calls.items() if m != "getUpdates"}
+
+    return {
+        "mode": mode,
+        "updates": len(updates),
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_ups": len(updates) / elapsed if elapsed else None,
+        "outbound_calls": outbound,
+        "calls_per_update": sum(outbound.values()) / len(updates) if updates else None,
+        "queries_per_update": (counter.count - queries_before) / len(updates) if counter and updates else None,
+        "unanswered": sum(1 for item in fake.tracked if item.responded is None),
+        "results": results,
+    }
@@ -0,0 +1,161 @@
+import asyncio
+import random
+import time
+from datetime import date, datetime
+
+import httpx
+
+import repository
+from database import get_db
+from services.reminders import ReminderWheel
+from bench.seed import TELEGRAM_ID_BASE
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, record):
+        # служебный сброс соединения при возврате в пул не считаем
+        if "RESET ALL" not in record.query:
+            self.count += 1
+
+    async def attach(self, con):
+        # init-хук пула: считаем каждый запрос каждого соединения
+        con.add_query_logger(self)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def measure(name, call, requests, concurrency, counter):
+    latencies = []
+    errors = 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in queue:
+            start = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "name": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "throughput_rps": requests / elapsed if elapsed else None,
+        "queries_per_request": (counter.count - queries_before) / requests,
+    }
+
+
+async def http_scenarios(app, prefix, users, habit_ids, requests, concurrency, counter):
+    rng = random.Random(42)
+    transport = httpx.ASGITransport(app=app)
+    results = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        def user():
+            return TELEGRAM_ID_BASE + rng.randrange(users)
+
+        async def check(response):
+            response.raise_for_status()
+
+        scenarios = [
+            ("list", lambda i: client.post("/api/habits", json={"telegram_id": user()})),
+            ("done", lambda i: client.post(
+                "/api/done", json={"telegram_id": 0, "habit_id": rng.choice(habit_ids)}
+            )),
+        ]
+        if prefix == "web":
+            scenarios.append(("list_get", lambda i: client.get(
+                "/api/habits", params={"telegram_id": user()}
+            )))
+
+        for name, request in scenarios:
+            async def call(i, request=request):
+                await check(await request(i))
+
+            results.append(await measure(f"{prefix}:{name}", call, requests, concurrency, counter))
+
+    return results
+
+
+async def query_scenarios(users, habit_ids, requests, concurrency, counter):
+    rng = random.Random(7)
+    today = date.today()
+
+    def user():
+        return TELEGRAM_ID_BASE + rng.randrange(users)
+
+    async def list_habits(i):
+        async with get_db() as db:
+            await repository.fetch_habits(db, user())
+
+    async def done(i):
+        async with get_db() as db:
+            await repository.complete_habit(db, rng.choice(habit_ids))
+
+    async def stats(i):
+        async with get_db() as db:
+            await repository.fetch_habit_stats(db, user())
+
+    async def activity(i):
+        async with get_db() as db:
+            await repository.fetch_daily_activity(db, user(), today.replace(day=1), today)
+
+    async def reminder_scan(i):
+        wheel = ReminderWheel()
+        async with get_db() as db:
+            await wheel.load(db)
+            now = datetime.utcnow()
+            for at, ids in wheel.due(now).items():
+                await repository.enqueue_reminders(db, ids, at)
+            batch = await repository.claim_reminders(db, 1000, 60, 5)
+            await repository.ack_reminders(db, [r.id for r in batch])
+
+    return [
+        await measure("sql:list", list_habits, requests, concurrency, counter),
+        await measure("sql:done", done, requests, concurrency, counter),
+        await measure("sql:stats", stats, requests, concurrency, counter),
+        await measure("sql:daily_activity", activity, requests, concurrency, counter),
+        await measure("sql:reminder_scan", reminder_scan, max(1, requests // 100), 1, counter),
+    ]
+
+
+async def run(requests=1000, concurrency=20, counter=None):
+    import web
+    import miniapp.web
+
+    async with get_db() as db:
+        users = await db.fetchval("SELECT COUNT(*) FROM users WHERE telegram_id >= $1", TELEGRAM_ID_BASE)
+        habit_ids = [r["id"] for r in await db.fetch("""
+            SELECT h.id FROM habits h JOIN users u ON u.id = h.user_id
+            WHERE u.telegram_id >= $1 AND h.is_active
+        """, TELEGRAM_ID_BASE)]
+
+    if not users or not habit_ids:
+        raise RuntimeError("no benchmark data, run `python -m bench seed` first")
+
+    results = []
+    results += await http_scenarios(web.app, "web", users, habit_ids, requests, concurrency, counter)
+    results += await http_scenarios(miniapp.web.app, "miniapp", users, habit_ids, requests, concurrency, counter)
+    results += await query_scenarios(users, habit_ids, requests, concurrency, counter)
+    return {"users": users, "habits": len(habit_ids), "results": results}
@@ -0,0 +1,91 @@
+import random
+from datetime import date, timedelta
+
+import rollup
+
+# все синтетические пользователи живут в этом диапазоне telegram_id
+TELEGRAM_ID_BASE = 9_000_000_000
+
+TITLES = ["Бег", "Чтение", "Вода", "Медитация", "Зарядка", "Английский", "Сон до 23:00", "Без сахара"]
+
+
+def habit_days(rng, days, density, today):
+    # даты выполнения одной привычки, от старых к новым
+    return [today - timedelta(days=i) for i in range(days - 1, -1, -1) if rng.random() < density]
+
+
+def streak_of(dates, today):
+    if not dates or dates[-1] < today - timedelta(days=1):
+        return 0, dates[-1] if dates else None
+
+    streak = 1
+    for prev, cur in zip(reversed(dates[:-1]), reversed(dates)):
+        if cur - prev != timedelta(days=1):
+            break
+        streak += 1
+    return streak, dates[-1]
+
+
+async def reset(db):
+    await db.execute("DELETE FROM users WHERE telegram_id >= $1", TELEGRAM_ID_BASE)
+
+
+async def seed(db, users=1000, habits=5, years=1.0, density=0.6, seed=1):
+    await reset(db)
+
+    today = date.today()
+    days = int(years * 365)
+    telegram_ids = [TELEGRAM_ID_BASE + i for i in range(users)]
+
+    await db.copy_records_to_table(
+        "users",
+        records=[(tid, 0, None) for tid in telegram_ids],
+        columns=["telegram_id", "timezone_offset", "reminder_time"],
+    )
+    user_ids = [r["id"] for r in await db.fetch(
+        "SELECT id FROM users WHERE telegram_id >= $1 ORDER BY telegram_id", TELEGRAM_ID_BASE
+    )]
+
+    # у каждой привычки свой генератор: первый проход считает серию,
+    # второй заново порождает те же даты потоком прямо в COPY
+    def rng_for(n):
+        return random.Random(seed * 1_000_003 + n)
+
+    habit_rows = []
+    for u, user_id in enumerate(user_ids):
+        for k in range(habits):
+            n = u * habits + k
+            streak, last = streak_of(habit_days(rng_for(n), days, density, today), today)
+            habit_rows.append((user_id, TITLES[k % len(TITLES)], streak, last))
+
+    await db.copy_records_to_table(
+        "habits",
+        records=habit_rows,
+        columns=["user_id", "title", "streak", "last_completed"],
+    )
+    habit_ids = [r["id"] for r in await db.fetch(
+        "SELECT id FROM habits WHERE user_id = ANY($1::int[]) ORDER BY id", user_ids
+    )]
+
+    def logs():
+        for n, habit_id in enumerate(habit_ids):
+            for d in habit_days(rng_for(n), days, density, today):
+                yield habit_id, d
+
+    await db.copy_records_to_table("habit_logs", records=logs(), columns=["habit_id", "date"])
+    await rollup.backfill(db)
+
+    # каждому десятому — напоминание, чтобы было что сканировать
+    await db.execute("""
+        UPDATE users SET reminder_time = make_time((id % 24)::int, (id % 60)::int, 0)
+        WHERE telegram_id >= $1 AND id % 10 = 0
+    """, TELEGRAM_ID_BASE)
+    await db.execute("ANALYZE users; ANALYZE habits; ANALYZE habit_logs; ANALYZE daily_activity")
+
+    return {
+        "users": users,
+        "habits": len(habit_ids),
+        "logs": await db.fetchval(
+            "SELECT COUNT(*) FROM habit_logs WHERE habit_id = ANY($1::int[])", habit_ids
+        ),
+    }
@@ -1,11 +1,18 @@
+import time
+
+# отсчёт старта — до тяжёлых импортов ниже
+STARTED = time.perf_counter()
+
+import asyncio
 import os
-import asyncpg
-import tempfile
-import matplotlib.pyplot as plt
+import signal
+from html import escape
+from io import BytesIO
 
 from datetime import date, timedelta, datetime
 
-from aiogram import Bot, Dispatcher, types
+from aiogram import Dispatcher, types
+from aiogram.bot.api import TelegramAPIServer, TELEGRAM_PRODUCTION
 from aiogram.types import (
     ReplyKeyboardMarkup,
     KeyboardButton,
@@ -13,10 +20,48 @@ from aiogram.types import (
     InlineKeyboardButton,
     WebAppInfo,
 )
-from aiogram.utils import executor
+from aiogram.utils.exceptions import (
+    MessageNotModified,
+    BotBlocked,
+    BotKicked,
+    CantInitiateConversation,
+    ChatNotFound,
+    UserDeactivated,
+)
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from openai import OpenAI
+
+from database import init_pool, close_pool, get_db
+import compact
+import repository
+from migrate import migrate
+from services.reminders import ReminderWheel
+from services import charts, llm
+from services.telegram import Bot, setup_metrics
+from services.updates import UpdateShards, poll
+from services.llm import ask_ai
+from utils.charts import activity_chart
+from handlers.stats import register_stats, totals_line
+from utils.prompts import habits_summary_prompt
+from utils import metrics
+from config import (
+    WARMUP_DELAY,
+    METRICS_ENABLED,
+    METRICS_PORT,
+    BOT_MODE,
+    WEBHOOK_URL,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_DROP_PENDING,
+    REMINDER_BATCH_SIZE,
+    REMINDER_LEASE,
+    REMINDER_MAX_ATTEMPTS,
+    REMINDER_RETRY_DELAY,
+    REMINDER_CATCHUP_MINUTES,
+    REMINDER_KEEP_DAYS,
+)
+
+IMPORTED = time.perf_counter()
 
 
 # =========================
@@ -27,65 +72,39 @@ BOT_TOKEN = os.getenv("BOT_TOKEN")
 DATABASE_URL = os.getenv("DATABASE_URL")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 WEBAPP_URL = os.getenv("WEBAPP_URL")
+# свой Bot API сервер (локальный telegram-bot-api или bench/fake_telegram.py)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
 
 if not BOT_TOKEN or not DATABASE_URL:
     raise RuntimeError("ENV variables not set")
 
-bot = Bot(token=BOT_TOKEN)
+if BOT_MODE == "webhook" and (not WEBHOOK_URL or not WEBHOOK_SECRET):
+    raise RuntimeError("WEBHOOK_URL and WEBHOOK_SECRET are required for BOT_MODE=webhook")
+
+bot = Bot(
+    token=BOT_TOKEN,
+    server=TelegramAPIServer.from_base(TELEGRAM_API_URL) if TELEGRAM_API_URL else TELEGRAM_PRODUCTION,
+)
 dp = Dispatcher(bot)
+setup_metrics(dp)
+# /stats — текстом, с итогами за 30 дней и год
+register_stats(dp)
+shards = UpdateShards(dp)
 
 scheduler = AsyncIOScheduler()
-ai_client = OpenAI(api_key=OPENAI_API_KEY)
-
-
-# =========================
-# DB
-# =========================
-
-async def get_db():
-    return await asyncpg.connect(DATABASE_URL)
-
-
-async def init_db():
-    db = await get_db()
-
-    # users
-    await db.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id SERIAL PRIMARY KEY,
-        telegram_id BIGINT UNIQUE,
-        timezone_offset INT DEFAULT 0,
-        reminder_time TIME
-    );
-    """)
-
-    # безопасно добавляем колонку
-    await db.execute(
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS last_reminder DATE"
-    )
+reminders = ReminderWheel()
+# разбор reminder_outbox: один на процесс
+outbox_lock = asyncio.Lock()
+sending = set()
+# фоновые задачи старта (прогрев, отчёт о первом апдейте)
+background = set()
+
+STARTUP_SECONDS = metrics.Gauge(
+    "habits_startup_seconds", "Длительность этапов старта бота", ["phase"]
+)
 
-    # habits
-    await db.execute("""
-    CREATE TABLE IF NOT EXISTS habits (
-        id SERIAL PRIMARY KEY,
-        user_id INT,
-        title TEXT,
-        streak INT DEFAULT 0,
-        last_completed DATE,
-        is_active BOOLEAN DEFAULT TRUE
-    );
-    """)
-
-    # habit logs
-    await db.execute("""
-    CREATE TABLE IF NOT EXISTS habit_logs (
-        id SERIAL PRIMARY KEY,
-        habit_id INT,
-        date DATE
-    );
-    """)
-
-    await db.close()
+# повторять бессмысленно: пользователь заблокировал бота или удалился
+UNDELIVERABLE = (BotBlocked, BotKicked, CantInitiateConversation, ChatNotFound, UserDeactivated)
 
 
 # =========================
@@ -119,18 +138,50 @@ def main_kb():
     return kb
 
 
+HABITS_PER_PAGE = 8
+
+
+def habits_page(rows, page):
+    pages = max(1, (len(rows) + HABITS_PER_PAGE - 1) // HABITS_PER_PAGE)
+    page = min(max(page, 0), pages - 1)
+    chunk = rows[page * HABITS_PER_PAGE:(page + 1) * HABITS_PER_PAGE]
+
+    header = "📋 <b>Мои привычки</b>"
+    if pages > 1:
+        header += f" ({page + 1}/{pages})"
+
+    lines = [
+        f"📌 <b>{escape(r['title'])}</b> — 🔥 {r['streak']}"
+        for r in chunk
+    ]
+
+    kb = InlineKeyboardMarkup()
+    for r in chunk:
+        title = r["title"] if len(r["title"]) <= 24 else r["title"][:23] + "…"
+        kb.row(
+            InlineKeyboardButton(f"✅ {title}", callback_data=f"done:{r['id']}:{page}"),
+            InlineKeyboardButton("🗑", callback_data=f"delete:{r['id']}:{page}"),
+        )
+
+    nav = []
+    if page > 0:
+        nav.append(InlineKeyboardButton("◀️", callback_data=f"page:{page - 1}"))
+    if page < pages - 1:
+        nav.append(InlineKeyboardButton("▶️", callback_data=f"page:{page + 1}"))
+    if nav:
+        kb.row(*nav)
+
+    return header + "\n\n" + "\n".join(lines), kb
+
+
 # =========================
 # START
 # =========================
 
 @dp.message_handler(commands=["start"])
 async def start_cmd(message: types.Message):
-    db = await get_db()
-    await db.execute(
-        "INSERT INTO users (telegram_id) VALUES ($1) ON CONFLICT DO NOTHING",
-        message.from_user.id,
-    )
-    await db.close()
+    async with get_db() as db:
+        await repository.ensure_user(db, message.from_user.id, message.from_user.username)
 
     await message.answer(
         "👋 Привет!\n\nЭто твой трекер привычек 👇",
@@ -159,18 +210,8 @@ async def add_habit(message: types.Message):
     if len(title) < 2:
         return
 
-    db = await get_db()
-    user = await db.fetchrow(
-        "SELECT id FROM users WHERE telegram_id=$1",
-        message.from_user.id,
-    )
-
-    await db.execute(
-        "INSERT INTO habits (user_id, title) VALUES ($1, $2)",
-        user["id"],
-        title,
-    )
-    await db.close()
+    async with get_db() as db:
+        await repository.add_habit(db, message.from_user.id, title)
 
     await message.answer(
         f"✅ Привычка «{title}» добавлена",
@@ -182,83 +223,90 @@ async def add_habit(message: types.Message):
 # LIST HABITS
 # =========================
 
+async def edit_habits_page(message: types.Message, rows, page):
+    if not rows:
+        await message.edit_text("Пока нет привычек 🙂")
+        return
+
+    text, kb = habits_page(rows, page)
+    try:
+        await message.edit_text(text, parse_mode="HTML", reply_markup=kb)
+    except MessageNotModified:
+        pass
+
+
 @dp.message_handler(lambda m: m.text == "📋 Мои привычки")
 async def list_habits(message: types.Message):
-    db = await get_db()
-    rows = await db.fetch("""
-        SELECT h.id, h.title, h.streak
-        FROM habits h
-        JOIN users u ON h.user_id=u.id
-        WHERE u.telegram_id=$1 AND h.is_active=TRUE
-        ORDER BY h.id
-    """, message.from_user.id)
-    await db.close()
+    async with get_db() as db:
+        rows = await repository.fetch_habits(db, message.from_user.id)
 
     if not rows:
         await message.answer("Пока нет привычек 🙂")
         return
 
-    for r in rows:
-        kb = InlineKeyboardMarkup(row_width=2)
-        kb.add(
-            InlineKeyboardButton("✅ Выполнено", callback_data=f"done:{r['id']}"),
-            InlineKeyboardButton("🗑 Удалить", callback_data=f"delete:{r['id']}"),
-        )
-
-        await message.answer(
-            f"📌 <b>{r['title']}</b>\n🔥 Серия: {r['streak']} дней",
-            parse_mode="HTML",
-            reply_markup=kb,
-        )
+    text, kb = habits_page(rows, 0)
+    await message.answer(text, parse_mode="HTML", reply_markup=kb)
 
 
 # =========================
 # CALLBACKS
 # =========================
 
+def parse_habit_callback(data):
+    # done:<habit_id>:<page>; у старых сообщений страницы нет
+    parts = data.split(":")
+    page = int(parts[2]) if len(parts) > 2 else None
+    return int(parts[1]), page
+
+
+@dp.callback_query_handler(lambda c: c.data.startswith("page:"))
+async def habits_page_cb(callback: types.CallbackQuery):
+    page = int(callback.data.split(":")[1])
+
+    async with get_db() as db:
+        rows = await repository.fetch_habits(db, callback.from_user.id)
+
+    await edit_habits_page(callback.message, rows, page)
+    await callback.answer()
+
+
 @dp.callback_query_handler(lambda c: c.data.startswith("done:"))
 async def mark_done(callback: types.CallbackQuery):
-    habit_id = int(callback.data.split(":")[1])
-    today = date.today()
+    habit_id, page = parse_habit_callback(callback.data)
 
-    db = await get_db()
-    habit = await db.fetchrow(
-        "SELECT streak, last_completed FROM habits WHERE id=$1",
-        habit_id,
-    )
+    async with get_db() as db:
+        result = await repository.complete_habit(db, habit_id)
+        if result and result["created"] and page is not None:
+            rows = await repository.fetch_habits(db, callback.from_user.id)
 
-    if habit["last_completed"] == today:
+    if not result:
+        await callback.answer("Привычка не найдена")
+        return
+
+    if not result["created"]:
         await callback.answer("Уже отмечено сегодня")
-        await db.close()
         return
 
-    streak = habit["streak"] + 1 if habit["last_completed"] == today - timedelta(days=1) else 1
+    if page is not None:
+        await edit_habits_page(callback.message, rows, page)
 
-    await db.execute(
-        "INSERT INTO habit_logs (habit_id, date) VALUES ($1, $2)",
-        habit_id, today,
-    )
-    await db.execute(
-        "UPDATE habits SET streak=$1, last_completed=$2 WHERE id=$3",
-        streak, today, habit_id,
-    )
-    await db.close()
-
-    await callback.answer(f"🔥 Серия: {streak} дней", show_alert=True)
+    await callback.answer(f"🔥 Серия: {result['streak']} дней", show_alert=True)
 
 
 @dp.callback_query_handler(lambda c: c.data.startswith("delete:"))
 async def delete_habit(callback: types.CallbackQuery):
-    habit_id = int(callback.data.split(":")[1])
+    habit_id, page = parse_habit_callback(callback.data)
 
-    db = await get_db()
-    await db.execute(
-        "UPDATE habits SET is_active=FALSE WHERE id=$1",
-        habit_id,
-    )
-    await db.close()
+    async with get_db() as db:
+        await repository.delete_habit(db, habit_id)
+        if page is not None:
+            rows = await repository.fetch_habits(db, callback.from_user.id)
+
+    if page is None:
+        await callback.message.edit_text("🗑 Привычка удалена")
+    else:
+        await edit_habits_page(callback.message, rows, page)
 
-    await callback.message.edit_text("🗑 Привычка удалена")
     await callback.answer("Удалено")
 
 
@@ -266,54 +314,57 @@ async def delete_habit(callback: types.CallbackQuery):
 # STATS
 # =========================
 
-@dp.message_handler(lambda m: m.text == "📊 Статистика")
-async def stats_cmd(message: types.Message):
-    db = await get_db()
+def stats_caption(habits, totals):
+    lines = [
+        f"{h['title']}: 🔥 {h['current_streak']} · 🏆 {h['longest_streak']} · {h['completion_rate']:.0%}"
+        for h in habits
+    ]
+    # итоги первыми: длинный список привычек обрежется, а они останутся
+    caption = totals_line(totals) + "\n\n" + "\n".join(lines)
+    # лимит подписи к фото в Telegram — 1024 символа
+    return caption if len(caption) <= 1024 else caption[:1023] + "…"
 
-    habits = await db.fetch("""
-        SELECT h.id
-        FROM habits h
-        JOIN users u ON h.user_id = u.id
-        WHERE u.telegram_id = $1 AND h.is_active = TRUE
-    """, message.from_user.id)
 
-    if not habits:
-        await message.answer("📊 Пока нет данных для статистики")
-        await db.close()
-        return
+@dp.message_handler(lambda m: m.text == "📊 Статистика")
+async def stats_cmd(message: types.Message):
+    async with get_db() as db:
+        habits = await repository.fetch_habit_stats(db, message.from_user.id)
 
-    today = date.today()
-    start = today - timedelta(days=6)
+        if not habits:
+            await message.answer("📊 Пока нет данных для статистики")
+            return
 
-    logs = await db.fetch("""
-        SELECT date, COUNT(*) cnt
-        FROM habit_logs
-        WHERE habit_id = ANY($1::int[])
-        AND date BETWEEN $2 AND $3
-        GROUP BY date
-        ORDER BY date
-    """, [h["id"] for h in habits], start, today)
+        today = date.today()
+        start = today - timedelta(days=6)
 
-    await db.close()
+        activity = await repository.fetch_daily_activity(db, message.from_user.id, start, today)
+        totals = await repository.fetch_activity_totals(db, message.from_user.id, today)
 
     days = [start + timedelta(days=i) for i in range(7)]
-    values = {row["date"]: row["cnt"] for row in logs}
+    values = {row["date"]: row["completions"] for row in activity}
     counts = [values.get(d, 0) for d in days]
 
-    plt.figure(figsize=(6, 4))
-    plt.plot(
+    caption = stats_caption(habits, totals)
+
+    key = charts.cache_key(message.from_user.id, start, today, counts)
+    cached = charts.get(key)
+    if cached and cached["file_id"]:
+        await message.answer_photo(cached["file_id"], caption=caption)
+        return
+
+    png = await charts.render(
+        key,
+        activity_chart,
         [d.strftime("%d.%m") for d in days],
         counts,
-        marker="o"
+        "📊 Активность за 7 дней",
     )
-    plt.title("📊 Активность за 7 дней")
-    plt.grid(True)
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    plt.savefig(tmp.name)
-    plt.close()
-
-    await message.answer_photo(open(tmp.name, "rb"))
+    sent = await message.answer_photo(
+        types.InputFile(BytesIO(png), filename="stats.png"),
+        caption=caption,
+    )
+    charts.remember_file_id(key, sent.photo[-1].file_id)
 
 # =========================
 # AI ANALYSIS
@@ -326,41 +377,19 @@ async def ai_analysis(message: types.Message):
         await message.answer("❌ OPENAI_API_KEY не задан")
         return
 
-    db = await get_db()
-    habits = await db.fetch("""
-        SELECT title, streak
-        FROM habits h
-        JOIN users u ON h.user_id = u.id
-        WHERE u.telegram_id = $1 AND h.is_active = TRUE
-    """, message.from_user.id)
-    await db.close()
+    async with get_db() as db:
+        habits = await repository.fetch_habit_stats(db, message.from_user.id)
 
     if not habits:
         await message.answer("🧠 Нет данных для анализа")
         return
 
-    summary = "\n".join(
-        f"- {h['title']}: {h['streak']} дней подряд"
-        for h in habits
-    )
-
-    prompt = f"""
-Ты коуч по привычкам.
-
-Привычки пользователя:
-{summary}
-
-Дай краткий анализ и 2 практических совета.
-"""
+    prompt = habits_summary_prompt(habits)
 
     await message.answer("🧠 Анализирую привычки...")
 
     try:
-        r = ai_client.responses.create(
-            model="gpt-4.1-mini",
-            input=prompt,
-        )
-        await message.answer(r.output_text)
+        await message.answer(await ask_ai(prompt))
     except Exception as e:
         print("AI ERROR:", e)
         await message.answer("⚠️ AI временно недоступен")
@@ -389,12 +418,11 @@ async def set_timezone(message: types.Message):
         await message.answer("Пример: /timezone +3")
         return
 
-    db = await get_db()
-    await db.execute(
-        "UPDATE users SET timezone_offset=$1 WHERE telegram_id=$2",
-        offset, message.from_user.id,
-    )
-    await db.close()
+    async with get_db() as db:
+        user = await repository.set_timezone(db, message.from_user.id, offset)
+
+    if user:
+        reminders.schedule(message.from_user.id, user["reminder_time"], user["timezone_offset"])
 
     await message.answer(f"🌍 Часовой пояс: UTC{offset:+}")
 
@@ -407,63 +435,226 @@ async def set_reminder(message: types.Message):
         await message.answer("Формат: /reminder 21:00")
         return
 
-    db = await get_db()
-    await db.execute(
-        "UPDATE users SET reminder_time=$1 WHERE telegram_id=$2",
-        t, message.from_user.id,
-    )
-    await db.close()
+    async with get_db() as db:
+        user = await repository.set_reminder_time(db, message.from_user.id, t)
+
+    if user:
+        reminders.schedule(message.from_user.id, user["reminder_time"], user["timezone_offset"])
 
     await message.answer(f"⏰ Напоминание установлено на {t.strftime('%H:%M')}")
 
 
 async def send_reminders():
-    utc_now = datetime.utcnow()
-    today = utc_now.date()
-
-    db = await get_db()
-    users = await db.fetch("""
-        SELECT telegram_id, timezone_offset, reminder_time, last_reminder
-        FROM users
-        WHERE reminder_time IS NOT NULL
-    """)
-
-    for u in users:
-        local_time = (
-            utc_now + timedelta(hours=u["timezone_offset"])
-        ).time().replace(second=0, microsecond=0)
-
-        if local_time == u["reminder_time"] and u["last_reminder"] != today:
-            try:
-                await bot.send_message(
-                    u["telegram_id"],
-                    "⏰ Напоминание!\nТы отметил привычки сегодня?",
+    now = datetime.utcnow()
+    minute = now.replace(second=0, microsecond=0)
+    # cron срабатывает в начале минуты — всё, что сверху, опоздание планировщика
+    metrics.SCHEDULER_LAG.set((now - minute).total_seconds(), "reminders")
+
+    due = reminders.due(now)
+    if due or minute.minute == 0:
+        async with get_db() as db:
+            for at, ids in due.items():
+                await repository.enqueue_reminders(db, ids, at)
+            if minute.minute == 0:
+                await repository.purge_reminders(db, REMINDER_KEEP_DAYS)
+
+    # разбираем очередь в фоне: большая пачка идёт дольше минуты,
+    # а следующий тик должен успеть положить свою корзину
+    if not outbox_lock.locked():
+        task = asyncio.create_task(drain_outbox())
+        sending.add(task)
+        task.add_done_callback(sending.discard)
+
+
+async def drain_outbox():
+    async with outbox_lock:
+        while True:
+            async with get_db() as db:
+                batch = await repository.claim_reminders(
+                    db, REMINDER_BATCH_SIZE, REMINDER_LEASE, REMINDER_MAX_ATTEMPTS
                 )
-                await db.execute(
-                    "UPDATE users SET last_reminder=$1 WHERE telegram_id=$2",
-                    today, u["telegram_id"],
-                )
-            except Exception as e:
-                print("Reminder error:", e)
+            if not batch:
+                return
+
+            # темп держит bot.limiter, поэтому отправляем всю пачку сразу
+            results = await asyncio.gather(*[send_reminder(r["telegram_id"]) for r in batch])
+
+            sent, failed, retry = [], [], []
+            for row, error in zip(batch, results):
+                if error is None:
+                    sent.append(row["id"])
+                elif isinstance(error, UNDELIVERABLE):
+                    failed.append((row["id"], str(error)))
+                else:
+                    retry.append(row["id"])
+
+            async with get_db() as db:
+                await repository.ack_reminders(db, sent, failed)
+                await repository.release_reminders(db, retry, REMINDER_RETRY_DELAY)
 
-    await db.close()
+
+async def send_reminder(telegram_id):
+    try:
+        await bot.send_message(
+            telegram_id,
+            "⏰ Напоминание!\nТы отметил привычки сегодня?",
+        )
+    except Exception as e:
+        metrics.ERRORS.inc("reminder")
+        print("Reminder error:", e)
+        return e
+
+
+async def maintain_habit_logs():
+    # секции habit_logs на месяцы вперёд и свёртка закрытых лет; несколько
+    # реплик не мешают друг другу — функции в БД берут advisory lock
+    try:
+        async with get_db() as db:
+            created, folded = await compact.maintain(db)
+    except Exception as e:
+        metrics.ERRORS.inc("maintenance")
+        print("habit_logs maintenance error:", e)
+        return
+
+    if created or folded:
+        print("🗜 habit_logs: new partitions", created, "folded", folded)
 
 
 # =========================
 # STARTUP
 # =========================
 
-async def on_startup(_):
-    await init_db()
-    scheduler.add_job(send_reminders, "interval", minutes=1)
+class StartupTimer:
+    # этапы старта: в лог одной строкой и в метрику habits_startup_seconds
+    def __init__(self):
+        self.phases = {"import": IMPORTED - STARTED}
+        self.last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = now - self.last
+        self.last = now
+
+    def report(self):
+        self.phases["total"] = time.perf_counter() - STARTED
+        for phase, seconds in self.phases.items():
+            STARTUP_SECONDS.set(seconds, phase)
+        print("⏱ Startup:", ", ".join(f"{p} {s:.2f}s" for p, s in self.phases.items()))
+
+
+def in_background(coro):
+    task = asyncio.create_task(coro)
+    background.add(task)
+    task.add_done_callback(background.discard)
+
+
+async def report_first_update():
+    await shards.first_update.wait()
+    seconds = time.perf_counter() - STARTED
+    STARTUP_SECONDS.set(seconds, "first_update")
+    print(f"⏱ First update answered {seconds:.2f}s after start")
+
+
+async def warm_up():
+    # графики и AI редки, поэтому их библиотеки не импортируются при старте;
+    # прогреваем позже, когда первые апдейты уже разобраны
+    await asyncio.sleep(WARMUP_DELAY)
+    start = time.perf_counter()
+    try:
+        # сначала пул: fork, пока в процессе нет потока, занятого импортом
+        await charts.warm_up()
+        await asyncio.to_thread(llm.warm_up)
+    except Exception as e:
+        print("Warm-up error:", e)
+        return
+    print(f"🔥 Charts and AI warmed up in {time.perf_counter() - start:.2f}s")
+
+
+async def startup():
+    timer = StartupTimer()
+    await init_pool()
+    timer.lap("db")
+
+    async with get_db() as db:
+        applied = await migrate(db)
+        timer.lap("migrate")
+        await reminders.load(db)
+        missed = await repository.enqueue_missed_reminders(db, datetime.utcnow(), REMINDER_CATCHUP_MINUTES)
+        timer.lap("reminders")
+
+    if applied:
+        print("✅ Applied migrations:", ", ".join(applied))
+    if missed:
+        print("⏰ Missed reminders queued:", missed)
+
+    # реплик может быть несколько: очередь общая, пачки разбираются через SKIP LOCKED
+    scheduler.add_job(send_reminders, "cron", minute="*")
+    scheduler.add_job(maintain_habit_logs, "cron", hour=3, minute=17)
     scheduler.start()
-    print("✅ Bot started with habits, AI, stats and reminders")
+    shards.start()
+
+    if BOT_MODE == "webhook":
+        await bot.set_webhook(
+            WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET,
+            # каждая реплика делает это при старте: сброс очереди Telegram
+            # при масштабировании или выкатке выбросил бы чужие апдейты
+            # (None — параметр не передаётся вовсе)
+            drop_pending_updates=WEBHOOK_DROP_PENDING or None,
+        )
+        timer.lap("webhook")
+    elif METRICS_ENABLED and METRICS_PORT:
+        # в webhook-режиме метрики отдаёт сам web.py
+        await metrics.serve(METRICS_PORT)
+        print("📈 Metrics on port", METRICS_PORT)
+
+    timer.report()
+    in_background(report_first_update())
+    if WARMUP_DELAY >= 0:
+        in_background(warm_up())
+
+    print(f"✅ Bot started ({BOT_MODE}) with habits, AI, stats and reminders")
     print("WEBAPP_URL =", WEBAPP_URL)
 
 
+async def shutdown():
+    for task in list(background):
+        task.cancel()
+    scheduler.shutdown(wait=False)
+    if sending:
+        await asyncio.wait(sending, timeout=30)
+    await shards.stop()
+    charts.shutdown()
+    session = await bot.get_session()
+    await session.close()
+    await close_pool()
+
+
+async def run_polling():
+    await dp.skip_updates()
+    await startup()
+    polling = asyncio.create_task(poll(shards))
+    # Render и прочие хостинги останавливают процесс SIGTERM-ом: тот же
+    # мягкий выход, что по Ctrl+C, — дослать очередь апдейтов и напоминаний
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, polling.cancel)
+    try:
+        await polling
+    except asyncio.CancelledError:
+        # SIGTERM отменил только опрос; Ctrl+C отменяет и сам run_polling
+        if asyncio.current_task().cancelling():
+            raise
+    finally:
+        await shutdown()
+
+
 if __name__ == "__main__":
-    executor.start_polling(
-        dp,
-        skip_updates=True,
-        on_startup=on_startup,
-    )
+    if BOT_MODE == "webhook":
+        import uvicorn
+
+        # web.py сам поднимет бота в lifespan
+        uvicorn.run("web:app", host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
+    else:
+        try:
+            asyncio.run(run_polling())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,38 @@
+import asyncio
+import sys
+
+import repository
+from config import HABIT_LOG_MONTHS_AHEAD
+from database import init_pool, close_pool, get_db
+
+# Обслуживание секционированной habit_logs (migrations/006):
+# месячные секции на HABIT_LOG_MONTHS_AHEAD вперёд и свёртка закрытых лет
+# в habit_log_years. Бот делает это раз в сутки; вручную —
+# python compact.py [месяцев_вперёд]
+
+
+async def maintain(db, months_ahead=HABIT_LOG_MONTHS_AHEAD):
+    created = await repository.ensure_partitions(db, months_ahead)
+    folded = {}
+    for year in await repository.compactable_years(db):
+        folded[year] = await repository.compact_year(db, year)
+    return created, folded
+
+
+async def main():
+    months_ahead = int(sys.argv[1]) if len(sys.argv) > 1 else HABIT_LOG_MONTHS_AHEAD
+
+    await init_pool()
+    try:
+        async with get_db() as db:
+            created, folded = await maintain(db, months_ahead)
+    finally:
+        await close_pool()
+
+    print(f"✅ new partitions: {created}")
+    for year, rows in folded.items():
+        print(f"✅ {year}: {rows} logs folded into habit_log_years")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
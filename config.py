@@ -6,3 +6,83 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# polling — bot.py сам опрашивает Telegram;
+# webhook — апдейты приходят POST-ом в web.py, бот и мини-апп в одном процессе
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# публичный адрес web.py, например https://habits.example.com
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram/webhook")
+# Telegram присылает его в X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+# сбросить накопленные в Telegram апдейты при регистрации вебхука; реплики
+# регистрируют его при каждом старте, так что по умолчанию ничего не теряем
+WEBHOOK_DROP_PENDING = os.getenv("WEBHOOK_DROP_PENDING", "").lower() in ("1", "true", "yes")
+
+# темп исходящих сообщений: на весь бот, на один чат (с запасом burst подряд)
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "30"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+TELEGRAM_CHAT_BURST = int(os.getenv("TELEGRAM_CHAT_BURST", "3"))
+TELEGRAM_MAX_RETRIES = int(os.getenv("TELEGRAM_MAX_RETRIES", "5"))
+
+# очередь напоминаний (reminder_outbox)
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "200"))
+# сколько секунд пачка принадлежит воркеру, прежде чем её заберёт другой
+REMINDER_LEASE = float(os.getenv("REMINDER_LEASE", "120"))
+REMINDER_MAX_ATTEMPTS = int(os.getenv("REMINDER_MAX_ATTEMPTS", "5"))
+REMINDER_RETRY_DELAY = float(os.getenv("REMINDER_RETRY_DELAY", "60"))
+# насколько далеко назад догонять пропущенные напоминания при старте
+REMINDER_CATCHUP_MINUTES = int(os.getenv("REMINDER_CATCHUP_MINUTES", "180"))
+REMINDER_KEEP_DAYS = int(os.getenv("REMINDER_KEEP_DAYS", "7"))
+
+# обработка апдейтов: очередей по telegram_id (= сколько апдейтов идёт параллельно) и глубина каждой
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "16"))
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "100"))
+
+# статика мини-аппа: 1 — перечитывать файлы с диска при изменении (для разработки)
+ASSETS_RELOAD = os.getenv("ASSETS_RELOAD", "").lower() in ("1", "true", "yes")
+
+# лента изменений для мини-аппа (LISTEN/NOTIFY -> /api/events);
+# за pgbouncer в режиме transaction LISTEN не работает — выключить
+EVENTS_ENABLED = os.getenv("EVENTS_ENABLED", "1").lower() in ("1", "true", "yes")
+# раз в сколько секунд слать пустой комментарий, чтобы прокси не рвали поток
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "25"))
+
+# на сколько месяцев вперёд держать готовые секции habit_logs
+HABIT_LOG_MONTHS_AHEAD = int(os.getenv("HABIT_LOG_MONTHS_AHEAD", "3"))
+
+# пул соединений с Postgres
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "10"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+DB_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", "300"))
+# соединение, простоявшее дольше этого (сек), пингуется перед выдачей; 0 — без проверки
+DB_HEALTH_CHECK_IDLE = float(os.getenv("DB_HEALTH_CHECK_IDLE", "30"))
+# подготовленных запросов на соединение; весь SQL в repository.py, так что хватает с запасом
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+# графики статистики
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "512"))
+
+# matplotlib и OpenAI SDK грузятся при первом графике/AI-анализе; через
+# столько секунд после старта их импорт делается в фоне заранее (<0 — не делать)
+WARMUP_DELAY = float(os.getenv("WARMUP_DELAY", "5"))
+
+# AI-анализ
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# можно направить на локальную заглушку OpenAI API, например http://127.0.0.1:8081/v1
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "21600"))
+
+# кэш списка привычек в web.py
+HABITS_CACHE_SIZE = int(os.getenv("HABITS_CACHE_SIZE", "10000"))
+HABITS_CACHE_TTL = float(os.getenv("HABITS_CACHE_TTL", "60"))
+
+# метрики Prometheus: /metrics в web.py, в боте — отдельный порт (0 — не поднимать)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "").lower() in ("1", "true", "yes")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
@@ -1,6 +1,107 @@
 
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
 import asyncpg
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_ACQUIRE_TIMEOUT,
+    DB_COMMAND_TIMEOUT,
+    DB_MAX_INACTIVE_LIFETIME,
+    DB_HEALTH_CHECK_IDLE,
+    DB_STATEMENT_CACHE_SIZE,
+    METRICS_ENABLED,
+)
+from utils import metrics
+
+pool = None
+
+_BROKEN_CONNECTION_ERRORS = (
+    asyncpg.PostgresConnectionError,
+    asyncpg.InterfaceError,
+    asyncio.TimeoutError,
+    OSError,
+)
+
+
+class Connection(asyncpg.Connection):
+    __slots__ = ("last_used",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_used = time.monotonic()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def idle_for(self):
+        return time.monotonic() - self.last_used
+
+
+async def _setup_connection(db, init):
+    if METRICS_ENABLED:
+        db.add_query_logger(metrics.log_query)
+    if init is not None:
+        await init(db)
+
 
+async def init_pool(init=None):
+    # init — корутина для каждого нового соединения (например, счётчик запросов в bench)
+    global pool
+    if pool is None:
+        pool = await asyncpg.create_pool(
+            DATABASE_URL,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            command_timeout=DB_COMMAND_TIMEOUT,
+            max_inactive_connection_lifetime=DB_MAX_INACTIVE_LIFETIME,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            connection_class=Connection,
+            init=lambda db: _setup_connection(db, init),
+        )
+    return pool
+
+
+async def close_pool():
+    global pool
+    if pool is not None:
+        await pool.close()
+        pool = None
+
+
+async def _is_alive(db):
+    try:
+        await db.execute("SELECT 1", timeout=DB_ACQUIRE_TIMEOUT)
+    except _BROKEN_CONNECTION_ERRORS:
+        return False
+    return True
+
+
+async def _acquire():
+    db = await pool.acquire(timeout=DB_ACQUIRE_TIMEOUT)
+    if not DB_HEALTH_CHECK_IDLE or db.idle_for() < DB_HEALTH_CHECK_IDLE:
+        return db
+
+    if await _is_alive(db):
+        return db
+
+    # соединение умерло, пока лежало в пуле (рестарт Postgres, обрыв сети)
+    db.terminate()
+    await pool.release(db)
+    return await pool.acquire(timeout=DB_ACQUIRE_TIMEOUT)
+
+
+@asynccontextmanager
 async def get_db():
-    return await asyncpg.connect(DATABASE_URL)
+    if pool is None:
+        raise RuntimeError("DB pool is not initialized, call init_pool() first")
+
+    db = await _acquire()
+    try:
+        yield db
+    finally:
+        db.touch()
+        await pool.release(db)
@@ -1,3 +1,4 @@
 from .start import register_start
 from .habits import register_habits
 from .ai_analysis import register_ai
+from .stats import register_stats
@@ -1,9 +1,24 @@
 from aiogram import types
 from aiogram.dispatcher import Dispatcher
+import repository
+from database import get_db
+from services.llm import ask_ai
+from utils.prompts import habits_summary_prompt
 
 
 def register_ai(dp: Dispatcher):
 
     @dp.message_handler(commands=["ai"])
-    async def ai_stub(message: types.Message):
-        await message.answer("🧠 AI-анализ скоро будет 😉")
+    async def ai_analysis(message: types.Message):
+        async with get_db() as db:
+            habits = await repository.fetch_habit_stats(db, message.from_user.id)
+
+        if not habits:
+            await message.answer("🧠 Нет данных для анализа")
+            return
+
+        try:
+            await message.answer(await ask_ai(habits_summary_prompt(habits)))
+        except Exception as e:
+            print("AI ERROR:", e)
+            await message.answer("⚠️ AI временно недоступен")
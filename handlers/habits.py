@@ -1,10 +1,8 @@
 from aiogram import types
 from aiogram.dispatcher import Dispatcher
+import repository
 from database import get_db
 
-ALTER TABLE habits ADD COLUMN IF NOT EXISTS streak INT DEFAULT 0;
-ALTER TABLE habits ADD COLUMN IF NOT EXISTS last_completed DATE;
-
 def register_habits(dp: Dispatcher):
 
     @dp.message_handler(commands=["add"])
@@ -14,16 +12,11 @@ def register_habits(dp: Dispatcher):
             await message.answer("Используй: /add Название привычки")
             return
 
-        db = await get_db()
-        user = await db.fetchrow(
-            "SELECT id FROM users WHERE telegram_id=$1",
-            message.from_user.id
-        )
+        async with get_db() as db:
+            habit = await repository.add_habit(db, message.from_user.id, title)
 
-        await db.execute(
-            "INSERT INTO habits (user_id, title) VALUES ($1, $2)",
-            user["id"], title
-        )
-        await db.close()
+        if habit is None:
+            await message.answer("Сначала нажми /start")
+            return
 
         await message.answer(f"✅ Привычка «{title}» добавлена")
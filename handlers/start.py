@@ -1,5 +1,6 @@
 from aiogram import types
 from aiogram.dispatcher import Dispatcher
+import repository
 from database import get_db
 
 
@@ -7,17 +8,8 @@ def register_start(dp: Dispatcher):
 
     @dp.message_handler(commands=["start"])
     async def start_cmd(message: types.Message):
-        db = await get_db()
-        await db.execute(
-            """
-            INSERT INTO users (telegram_id, username)
-            VALUES ($1, $2)
-            ON CONFLICT (telegram_id) DO NOTHING
-            """,
-            message.from_user.id,
-            message.from_user.username,
-        )
-        await db.close()
+        async with get_db() as db:
+            await repository.ensure_user(db, message.from_user.id, message.from_user.username)
 
         await message.answer(
             "👋 Привет!\n\n"
@@ -1,27 +1,33 @@
-from aiogram import Router
-from aiogram.types import Message
+from aiogram import types
+from aiogram.dispatcher import Dispatcher
+import repository
 from database import get_db
 
-router = Router()
-
-@router.message(commands=["stats"])
-async def stats(message: Message):
-    db = await get_db()
-    rows = await db.fetch("""
-        SELECT h.title, COUNT(l.id) AS days
-        FROM habits h
-        LEFT JOIN habit_logs l ON h.id = l.habit_id
-        WHERE h.user_id=$1
-        GROUP BY h.title
-    """, message.from_user.id)
-    await db.close()
-
-    if not rows:
-        await message.answer("Нет данных для статистики")
-        return
-
-    text = "📊 Статистика:\n\n"
-    for r in rows:
-        text += f"• {r['title']}: {r['days']} дней\n"
-
-    await message.answer(text)
+
+def totals_line(totals):
+    return (
+        f"Отметок за 7 дней: {totals['week']}, "
+        f"за 30 дней: {totals['month']}, за год: {totals['year']}"
+    )
+
+
+def register_stats(dp: Dispatcher):
+
+    @dp.message_handler(commands=["stats"])
+    async def stats(message: types.Message):
+        async with get_db() as db:
+            rows = await repository.fetch_habit_stats(db, message.from_user.id)
+            totals = await repository.fetch_activity_totals(db, message.from_user.id)
+
+        if not rows:
+            await message.answer("Нет данных для статистики")
+            return
+
+        text = "📊 Статистика:\n\n"
+        for r in rows:
+            text += (
+                f"• {r['title']}: {r['total']} дней, "
+                f"серия {r['current_streak']}, рекорд {r['longest_streak']}\n"
+            )
+
+        await message.answer(text + "\n" + totals_line(totals))
@@ -0,0 +1,98 @@
+import asyncio
+import re
+from pathlib import Path
+
+from database import init_pool, close_pool, get_db
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# CREATE INDEX CONCURRENTLY и т.п. нельзя выполнять в транзакции
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+# pg_advisory_lock: две реплики не накатят миграции одновременно
+LOCK_ID = 7_265_001
+
+# DDL по большим таблицам может идти дольше обычного command_timeout
+MIGRATION_TIMEOUT = 3600
+
+
+def load_migrations():
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        match = re.match(r"^(\d+)_", path.name)
+        if match:
+            migrations.append((int(match.group(1)), path.stem, path.read_text(encoding="utf-8")))
+    return migrations
+
+
+def split_statements(sql):
+    # только для no-transaction файлов: там нет DO-блоков и функций
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+async def current_version(db):
+    if await db.fetchval("SELECT to_regclass('schema_version')") is None:
+        return 0
+    return await db.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+
+
+async def migrate(db):
+    migrations = load_migrations()
+    if not migrations or await current_version(db) >= migrations[-1][0]:
+        return []
+
+    await db.execute("SELECT pg_advisory_lock($1)", LOCK_ID)
+    try:
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        """)
+        done = {r["version"] for r in await db.fetch("SELECT version FROM schema_version")}
+
+        applied = []
+        for version, name, sql in migrations:
+            if version in done:
+                continue
+
+            if NO_TRANSACTION in sql:
+                for stmt in split_statements(sql):
+                    await db.execute(stmt, timeout=MIGRATION_TIMEOUT)
+                await db.execute(
+                    "INSERT INTO schema_version (version, name) VALUES ($1, $2)",
+                    version, name,
+                )
+            else:
+                async with db.transaction():
+                    await db.execute(sql, timeout=MIGRATION_TIMEOUT)
+                    await db.execute(
+                        "INSERT INTO schema_version (version, name) VALUES ($1, $2)",
+                        version, name,
+                    )
+
+            applied.append(name)
+
+        return applied
+    finally:
+        await db.execute("SELECT pg_advisory_unlock($1)", LOCK_ID)
+
+
+async def main():
+    await init_pool()
+    try:
+        async with get_db() as db:
+            applied = await migrate(db)
+    finally:
+        await close_pool()
+
+    if applied:
+        print("✅ Applied migrations:", ", ".join(applied))
+    else:
+        print("✅ Schema is up to date")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
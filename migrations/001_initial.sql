@@ -0,0 +1,79 @@
+-- Базовая схема. Идемпотентна: сводит к одному виду и базы, созданные
+-- старым init_db из bot.py, и базы, созданные из models.sql.
+
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    telegram_id BIGINT UNIQUE NOT NULL,
+    username TEXT,
+    timezone_offset INT DEFAULT 0,
+    reminder_time TIME,
+    last_reminder DATE,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS username TEXT;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS timezone_offset INT DEFAULT 0;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS reminder_time TIME;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS last_reminder DATE;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
+
+CREATE TABLE IF NOT EXISTS habits (
+    id SERIAL PRIMARY KEY,
+    user_id INT NOT NULL,
+    title TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    is_active BOOLEAN DEFAULT TRUE,
+    streak INT DEFAULT 0,
+    last_completed DATE,
+    CONSTRAINT fk_user FOREIGN KEY (user_id)
+        REFERENCES users(id) ON DELETE CASCADE
+);
+
+ALTER TABLE habits ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW();
+ALTER TABLE habits ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE;
+ALTER TABLE habits ADD COLUMN IF NOT EXISTS streak INT DEFAULT 0;
+ALTER TABLE habits ADD COLUMN IF NOT EXISTS last_completed DATE;
+
+CREATE TABLE IF NOT EXISTS habit_logs (
+    id SERIAL PRIMARY KEY,
+    habit_id INT REFERENCES habits(id) ON DELETE CASCADE,
+    date DATE NOT NULL
+);
+
+-- одна отметка на привычку в день (на этом держится complete_habit)
+DO $$
+BEGIN
+    IF to_regclass('habit_logs_habit_id_date_key') IS NULL THEN
+        DELETE FROM habit_logs a
+        USING habit_logs b
+        WHERE a.habit_id = b.habit_id
+        AND a.date = b.date
+        AND a.id > b.id;
+
+        CREATE UNIQUE INDEX habit_logs_habit_id_date_key
+        ON habit_logs (habit_id, date);
+    END IF;
+END
+$$;
+
+-- у таблиц из старого init_db не было внешних ключей;
+-- NOT VALID, чтобы не падать на исторических «сиротах»
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'habits'::regclass AND contype = 'f'
+    ) THEN
+        ALTER TABLE habits ADD CONSTRAINT fk_user FOREIGN KEY (user_id)
+            REFERENCES users(id) ON DELETE CASCADE NOT VALID;
+    END IF;
+
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'habit_logs'::regclass AND contype = 'f'
+    ) THEN
+        ALTER TABLE habit_logs ADD CONSTRAINT habit_logs_habit_id_fkey FOREIGN KEY (habit_id)
+            REFERENCES habits(id) ON DELETE CASCADE NOT VALID;
+    END IF;
+END
+$$;
@@ -0,0 +1,11 @@
+-- migrate: no-transaction
+-- Индексы под горячие запросы, без блокировки записи.
+-- habit_logs (habit_id, date) уже покрыт уникальным индексом из 001.
+
+-- список активных привычек пользователя, ORDER BY id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS habits_user_active_idx
+    ON habits (user_id, id) WHERE is_active;
+
+-- загрузка колеса напоминаний
+CREATE INDEX CONCURRENTLY IF NOT EXISTS users_reminder_time_idx
+    ON users (reminder_time) WHERE reminder_time IS NOT NULL;
@@ -0,0 +1,12 @@
+-- Дневной агрегат по пользователю: все экраны статистики читают
+-- диапазон по первичному ключу, не трогая habit_logs.
+-- Пишется в той же транзакции, что отметка и удаление (repository.py);
+-- для старых данных — python rollup.py
+
+CREATE TABLE IF NOT EXISTS daily_activity (
+    user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    date DATE NOT NULL,
+    completions INT NOT NULL DEFAULT 0,
+    active_habits INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, date)
+);
@@ -0,0 +1,21 @@
+-- Очередь напоминаний: строка на пользователя и дату (UTC) срабатывания.
+-- Планировщик кладёт сюда всю минутную корзину разом, воркеры любых
+-- реплик разбирают её через FOR UPDATE SKIP LOCKED, после отправки
+-- строка помечается sent_at, а users.last_reminder обновляется пачкой.
+
+CREATE TABLE IF NOT EXISTS reminder_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    telegram_id BIGINT NOT NULL,
+    day DATE NOT NULL,
+    -- момент срабатывания по UTC
+    due_at TIMESTAMP NOT NULL,
+    -- занято воркером до этого момента; после — строку можно забрать снова
+    claimed_until TIMESTAMPTZ,
+    attempts INT NOT NULL DEFAULT 0,
+    sent_at TIMESTAMPTZ,
+    error TEXT,
+    UNIQUE (telegram_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS reminder_outbox_pending_idx
+    ON reminder_outbox (due_at) WHERE sent_at IS NULL;
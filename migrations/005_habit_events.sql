@@ -0,0 +1,51 @@
+-- Лента изменений: каждая запись в habits (добавление, отметка — она
+-- двигает streak/last_completed, мягкое удаление) шлёт NOTIFY habit_changes
+-- с готовым состоянием привычки. web.py слушает канал одним соединением
+-- и раздаёт события открытым мини-аппам владельца (/api/events).
+-- Массовые операции могут заглушить ленту: SET LOCAL habits.mute_events = 'on'.
+
+CREATE OR REPLACE FUNCTION notify_habit_change() RETURNS trigger AS $$
+DECLARE
+    h habits;
+    payload TEXT;
+BEGIN
+    IF current_setting('habits.mute_events', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        h := OLD;
+    ELSE
+        h := NEW;
+    END IF;
+
+    -- streak в том же виде, что отдаёт repository.fetch_habits
+    payload := json_build_object(
+        'telegram_id', (SELECT telegram_id FROM users WHERE id = h.user_id),
+        'op', CASE WHEN TG_OP = 'DELETE' OR NOT h.is_active THEN 'delete' ELSE 'upsert' END,
+        'habit', json_build_object(
+            'id', h.id,
+            'title', h.title,
+            'streak', CASE WHEN h.last_completed >= CURRENT_DATE - 1 THEN h.streak ELSE 0 END
+        )
+    )::text;
+
+    -- NOTIFY ограничен 8000 байт: длинное название — пусть клиент перечитает список
+    IF octet_length(payload) > 7900 THEN
+        payload := json_build_object(
+            'telegram_id', (SELECT telegram_id FROM users WHERE id = h.user_id),
+            'op', 'reload'
+        )::text;
+    END IF;
+
+    PERFORM pg_notify('habit_changes', payload);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS habits_notify ON habits;
+
+CREATE TRIGGER habits_notify
+    AFTER INSERT OR DELETE OR UPDATE OF title, streak, last_completed, is_active
+    ON habits
+    FOR EACH ROW EXECUTE FUNCTION notify_habit_change();
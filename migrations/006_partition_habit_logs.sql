@@ -0,0 +1,209 @@
+-- habit_logs секционируется по месяцам (RANGE по date).
+-- Вся прежняя таблица без копирования становится секцией habit_logs_archive
+-- (до конца месяца последней отметки), дальше — по секции на месяц, их заранее
+-- создаёт ensure_habit_log_partitions(); то, для чего секции ещё нет,
+-- попадает в habit_logs_default и переезжает, когда секция появится.
+--
+-- Закрытые годы сворачиваются в habit_log_years — одна bytea на
+-- привычку и год, бит i = 1 января + i (порядок битов как у get_bit и
+-- HabitHistory.from_bitmap). Читать историю целиком — через view habit_days.
+
+DO $$
+DECLARE
+    boundary DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'habit_logs'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE habit_logs RENAME TO habit_logs_archive;
+    ALTER TABLE habit_logs_archive RENAME CONSTRAINT habit_logs_pkey TO habit_logs_archive_pkey;
+    ALTER INDEX habit_logs_habit_id_date_key RENAME TO habit_logs_archive_habit_id_date_key;
+
+    -- у секции все колонки ключа и FK должны быть NOT NULL и валидны;
+    -- «сироты» из времён без внешних ключей всё равно ни к чему не относятся
+    DELETE FROM habit_logs_archive l
+    WHERE l.habit_id IS NULL OR l.date IS NULL
+    OR NOT EXISTS (SELECT 1 FROM habits h WHERE h.id = l.habit_id);
+    ALTER TABLE habit_logs_archive ALTER COLUMN habit_id SET NOT NULL;
+    ALTER TABLE habit_logs_archive ALTER COLUMN date SET NOT NULL;
+    ALTER TABLE habit_logs_archive DROP CONSTRAINT IF EXISTS habit_logs_habit_id_fkey;
+
+    -- у секции не может быть колонок, которых нет у родителя: в базах из
+    -- models.sql осталась completed (код её не пишет, FALSE — не отметка)
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema()
+        AND table_name = 'habit_logs_archive' AND column_name = 'completed'
+    ) THEN
+        EXECUTE 'DELETE FROM habit_logs_archive WHERE completed IS FALSE';
+        ALTER TABLE habit_logs_archive DROP COLUMN completed;
+    END IF;
+
+    -- архив заканчивается на месяце последней отметки (не раньше текущего)
+    SELECT GREATEST(
+        date_trunc('month', CURRENT_DATE),
+        date_trunc('month', MAX(date)) + INTERVAL '1 month'
+    )::date
+    INTO boundary
+    FROM habit_logs_archive;
+
+    CREATE TABLE habit_logs (
+        id INT NOT NULL DEFAULT nextval('habit_logs_id_seq'),
+        habit_id INT NOT NULL REFERENCES habits(id) ON DELETE CASCADE,
+        date DATE NOT NULL
+    ) PARTITION BY RANGE (date);
+
+    -- уникальный индекс архивной секции подцепится к этому, а не построится заново
+    CREATE UNIQUE INDEX habit_logs_habit_id_date_key ON habit_logs (habit_id, date);
+
+    EXECUTE format(
+        'ALTER TABLE habit_logs ATTACH PARTITION habit_logs_archive FOR VALUES FROM (MINVALUE) TO (%L)',
+        boundary
+    );
+    CREATE TABLE habit_logs_default PARTITION OF habit_logs DEFAULT;
+END
+$$;
+
+
+CREATE OR REPLACE FUNCTION ensure_habit_log_partitions(months_ahead INT DEFAULT 3)
+RETURNS INT AS $$
+DECLARE
+    month DATE;
+    name TEXT;
+    created INT := 0;
+BEGIN
+    -- реплики бота зовут это по расписанию одновременно
+    PERFORM pg_advisory_xact_lock(7265006);
+
+    FOR n IN 0..months_ahead LOOP
+        month := (date_trunc('month', CURRENT_DATE) + make_interval(months => n))::date;
+        name := format('habit_logs_%s', to_char(month, 'YYYY_MM'));
+
+        -- месяц уже покрыт секцией (в том числе архивной)
+        CONTINUE WHEN EXISTS (
+            SELECT 1 FROM pg_inherits inh
+            JOIN pg_class c ON c.oid = inh.inhrelid
+            WHERE inh.inhparent = 'habit_logs'::regclass
+            AND c.relname <> 'habit_logs_default'
+            AND month >= COALESCE(
+                substring(pg_get_expr(c.relpartbound, c.oid) FROM $re$FROM \('([0-9-]+)'\)$re$)::date,
+                '-infinity'
+            )
+            AND month < substring(pg_get_expr(c.relpartbound, c.oid) FROM $re$TO \('([0-9-]+)'\)$re$)::date
+        );
+
+        -- строки этого месяца, успевшие упасть в default, переезжают в новую секцию
+        EXECUTE format('CREATE TABLE %I (LIKE habit_logs INCLUDING DEFAULTS)', name);
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM habit_logs_default WHERE date >= %L AND date < %L RETURNING *)
+             INSERT INTO %I SELECT * FROM moved',
+            month, (month + INTERVAL '1 month')::date, name
+        );
+        EXECUTE format(
+            'ALTER TABLE habit_logs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+            name, month, (month + INTERVAL '1 month')::date
+        );
+        created := created + 1;
+    END LOOP;
+
+    RETURN created;
+END
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_habit_log_partitions(3);
+
+
+CREATE TABLE IF NOT EXISTS habit_log_years (
+    habit_id INT NOT NULL REFERENCES habits(id) ON DELETE CASCADE,
+    year SMALLINT NOT NULL,
+    days BYTEA NOT NULL,
+    PRIMARY KEY (habit_id, year)
+);
+
+
+-- Сворачивает год в habit_log_years (сливая с уже свёрнутым — на случай
+-- импорта задним числом) и убирает его строки из habit_logs: месячные секции
+-- целиком внутри года удаляются, из архивной и default — DELETE.
+CREATE OR REPLACE FUNCTION compact_habit_logs(y INT)
+RETURNS BIGINT AS $$
+DECLARE
+    first_day DATE := make_date(y, 1, 1);
+    next_year DATE := make_date(y + 1, 1, 1);
+    folded BIGINT;
+    part RECORD;
+BEGIN
+    IF next_year > CURRENT_DATE THEN
+        RAISE EXCEPTION 'year % is not closed yet', y;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(7265006);
+
+    WITH offsets AS (
+        SELECT habit_id, date - first_day AS d
+        FROM habit_logs
+        WHERE date >= first_day AND date < next_year
+        UNION
+        SELECT habit_id, b.i
+        FROM habit_log_years,
+        LATERAL generate_series(0, octet_length(days) * 8 - 1) AS b(i)
+        WHERE year = y AND get_bit(days, b.i) = 1
+    ),
+    bytes AS (
+        SELECT habit_id, d / 8 AS i, SUM(1 << (d % 8))::int AS b
+        FROM offsets
+        GROUP BY habit_id, d / 8
+    )
+    INSERT INTO habit_log_years (habit_id, year, days)
+    SELECT h.habit_id, y, decode(string_agg(lpad(to_hex(COALESCE(bytes.b, 0)), 2, '0'), '' ORDER BY s.i), 'hex')
+    FROM (SELECT DISTINCT habit_id FROM bytes) h
+    CROSS JOIN generate_series(0, (next_year - first_day - 1) / 8) AS s(i)
+    LEFT JOIN bytes ON bytes.habit_id = h.habit_id AND bytes.i = s.i
+    -- привычку могли удалить между чтением и вставкой
+    WHERE EXISTS (SELECT 1 FROM habits WHERE id = h.habit_id)
+    GROUP BY h.habit_id
+    ON CONFLICT (habit_id, year) DO UPDATE SET days = EXCLUDED.days;
+
+    SELECT COUNT(*) INTO folded FROM habit_logs WHERE date >= first_day AND date < next_year;
+
+    FOR part IN
+        SELECT c.relname,
+            substring(pg_get_expr(c.relpartbound, c.oid) FROM $re$FROM \('([0-9-]+)'\)$re$)::date AS lo,
+            substring(pg_get_expr(c.relpartbound, c.oid) FROM $re$TO \('([0-9-]+)'\)$re$)::date AS hi
+        FROM pg_inherits inh
+        JOIN pg_class c ON c.oid = inh.inhrelid
+        WHERE inh.inhparent = 'habit_logs'::regclass
+    LOOP
+        IF part.lo >= first_day AND part.hi <= next_year THEN
+            EXECUTE format('DROP TABLE %I', part.relname);
+        END IF;
+    END LOOP;
+
+    DELETE FROM habit_logs WHERE date >= first_day AND date < next_year;
+    RETURN folded;
+END
+$$ LANGUAGE plpgsql;
+
+
+-- все отметки: свёрнутые годы, развёрнутые обратно в даты, плюс habit_logs.
+-- Одна дата не бывает в обоих местах: отметки свёрнутого года переносятся
+-- целиком, а импорт задним числом пропускает уже свёрнутые дни.
+CREATE OR REPLACE VIEW habit_days AS
+    SELECT habit_id, date FROM habit_logs
+    UNION ALL
+    SELECT y.habit_id, make_date(y.year, 1, 1) + b.i
+    FROM habit_log_years y,
+    LATERAL generate_series(0, octet_length(y.days) * 8 - 1) AS b(i)
+    WHERE get_bit(y.days, b.i) = 1;
+
+-- то же для одной привычки: SQL-функция встраивается в запрос, и в
+-- LATERAL обе части читаются по индексу привычки (через view планировщик
+-- предпочитает развернуть все битовые карты и соединить хэшем)
+CREATE OR REPLACE FUNCTION habit_days_of(hid INT) RETURNS TABLE (date DATE) AS $$
+    SELECT date FROM habit_logs WHERE habit_id = hid
+    UNION ALL
+    SELECT make_date(y.year, 1, 1) + b.i
+    FROM habit_log_years y,
+    LATERAL generate_series(0, octet_length(y.days) * 8 - 1) AS b(i)
+    WHERE y.habit_id = hid AND get_bit(y.days, b.i) = 1
+$$ LANGUAGE sql STABLE;
@@ -1,6 +1,7 @@
 const tg = window.Telegram?.WebApp;
 
-const API_URL = "https://storied-bubblegum-a94e6a.netlify.app"; // ← ПОКА ТАК
+// мини-апп отдаёт web.py, API на том же origin
+const API_URL = "";
 
 let user;
 
@@ -18,18 +19,29 @@ async function api(path, data = {}) {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify({
-      user_id: user.id,
+      telegram_id: user.id,
       ...data
     })
   });
   return res.json();
 }
 
+let habits = [];
+
 async function loadHabits() {
-  const habits = await api("/api/habits");
+  habits = await api("/api/habits");
+  render();
+}
+
+function render() {
   const root = document.getElementById("habits");
   root.innerHTML = "";
 
+  if (!habits.length) {
+    root.textContent = "Пока нет привычек";
+    return;
+  }
+
   habits.forEach(h => {
     const div = document.createElement("div");
     div.className = "card";
@@ -43,14 +55,52 @@ async function loadHabits() {
   });
 }
 
+async function add() {
+  const input = document.getElementById("title");
+  const title = input.value.trim();
+  if (!title) return;
+  const r = await api("/api/add", { title });
+  if (!r.ok) return loadHabits();
+  input.value = "";
+  // лента могла принести привычку раньше ответа
+  if (!habits.some(h => h.id === r.habit.id)) habits.push(r.habit);
+  render();
+}
+
+// ответ мутации уже содержит свежее состояние привычки
 async function done(id) {
-  await api("/api/done", { habit_id: id });
-  loadHabits();
+  const r = await api("/api/done", { habit_id: id });
+  if (!r.ok) return loadHabits();
+  habits = habits.map(h => h.id === id ? r.habit : h);
+  render();
 }
 
 async function del(id) {
-  await api("/api/delete", { habit_id: id });
-  loadHabits();
+  habits = habits.filter(h => h.id !== id);
+  render();
+  const r = await api("/api/delete", { habit_id: id });
+  if (!r.ok) loadHabits();
+}
+
+// изменения из бота и других вкладок приходят сами (Server-Sent Events)
+function listen() {
+  const es = new EventSource(API_URL + "/api/events?telegram_id=" + user.id);
+  let opened = false;
+  // после переподключения события за время обрыва потеряны — перечитываем
+  es.onopen = () => { if (opened) loadHabits(); opened = true; };
+  es.onmessage = e => {
+    const ev = JSON.parse(e.data);
+    if (ev.op === "reload") return loadHabits();
+    if (ev.op === "delete") {
+      habits = habits.filter(h => h.id !== ev.habit.id);
+    } else if (habits.some(h => h.id === ev.habit.id)) {
+      habits = habits.map(h => h.id === ev.habit.id ? ev.habit : h);
+    } else {
+      habits.push(ev.habit);
+    }
+    render();
+  };
 }
 
 loadHabits();
+listen();
@@ -1,15 +1,20 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from pydantic import BaseModel
-import asyncpg
-import os
-from datetime import date
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+from database import init_pool, close_pool, get_db
+import repository
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_pool()
+    yield
+    await close_pool()
 
-app = FastAPI()
 
-async def get_db():
-    return await asyncpg.connect(DATABASE_URL)
+app = FastAPI(lifespan=lifespan)
 
 class User(BaseModel):
     telegram_id: int
@@ -20,34 +25,26 @@ class HabitAction(BaseModel):
 
 @app.post("/api/habits")
 async def habits(data: User):
-    db = await get_db()
-    rows = await db.fetch("""
-        SELECT h.id, h.title, h.streak
-        FROM habits h
-        JOIN users u ON h.user_id=u.id
-        WHERE u.telegram_id=$1 AND h.is_active=TRUE
-        ORDER BY h.id
-    """, data.telegram_id)
-    await db.close()
+    async with get_db() as db:
+        rows = await repository.fetch_habits(db, data.telegram_id)
     return [dict(r) for r in rows]
 
 @app.post("/api/done")
 async def done(data: HabitAction):
-    today = date.today()
-    db = await get_db()
-    await db.execute(
-        "UPDATE habits SET streak=streak+1, last_completed=$1 WHERE id=$2",
-        today, data.habit_id,
-    )
-    await db.close()
-    return {"ok": True}
+    async with get_db() as db:
+        result = await repository.complete_habit(db, data.habit_id)
+
+    if not result:
+        return {"ok": False}
+
+    return {
+        "ok": True,
+        "created": result["created"],
+        "habit": {"id": result["id"], "title": result["title"], "streak": result["streak"]},
+    }
 
 @app.post("/api/delete")
 async def delete(data: HabitAction):
-    db = await get_db()
-    await db.execute(
-        "UPDATE habits SET is_active=FALSE WHERE id=$1",
-        data.habit_id,
-    )
-    await db.close()
-    return {"ok": True}
+    async with get_db() as db:
+        telegram_id = await repository.delete_habit(db, data.habit_id)
+    return {"ok": telegram_id is not None, "habit_id": data.habit_id}
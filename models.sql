@@ -1,29 +0,0 @@
-CREATE TABLE IF NOT EXISTS users (
-    id SERIAL PRIMARY KEY,
-    telegram_id BIGINT UNIQUE NOT NULL,
-    username TEXT,
-    created_at TIMESTAMP DEFAULT NOW()
-);
-
-CREATE TABLE IF NOT EXISTS habits (
-    id SERIAL PRIMARY KEY,
-    user_id INT NOT NULL,
-    title TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT NOW(),
-    is_active BOOLEAN DEFAULT TRUE,
-    reminder_time TIME,
-    streak INT DEFAULT 0,
-    last_completed DATE,
-    CONSTRAINT fk_user FOREIGN KEY (user_id)
-        REFERENCES users(id) ON DELETE CASCADE
-);
-
-CREATE TABLE IF NOT EXISTS habit_logs (
-    id SERIAL PRIMARY KEY,
-    habit_id INT REFERENCES habits(id) ON DELETE CASCADE,
-    date DATE NOT NULL,
-    completed BOOLEAN DEFAULT TRUE,
-    UNIQUE (habit_id, date)
-);
-ALTER TABLE users
-ADD COLUMN IF NOT EXISTS timezone_offset INT DEFAULT 0;
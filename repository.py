@@ -0,0 +1,694 @@
+from datetime import date, timedelta
+
+import asyncpg
+
+from utils.analytics import HabitHistory
+
+# Весь SQL бота, web.py, miniapp и handlers/ — здесь.
+# Запросы идут через fetch*/execute с аргументами, поэтому asyncpg
+# готовит каждый один раз на соединение и дальше берёт из своего кэша
+# (statement_cache_size в database.py); явный PreparedStatement для пула
+# не годится — он протухает, когда соединение возвращается в пул.
+
+
+class Row(asyncpg.Record):
+    # строка результата с доступом и по ключу, и по атрибуту: row["title"] / row.title
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def as_dict(self):
+        return dict(self.items())
+
+
+class User(Row):
+    __slots__ = ()
+
+    id: int
+    telegram_id: int
+
+
+class ReminderSettings(Row):
+    __slots__ = ()
+
+    telegram_id: int
+    reminder_time: object
+    timezone_offset: int
+
+
+class Habit(Row):
+    __slots__ = ()
+
+    id: int
+    title: str
+    streak: int
+
+
+class Completion(Row):
+    __slots__ = ()
+
+    id: int
+    title: str
+    found: bool
+    created: bool
+    streak: int
+    telegram_id: int
+
+
+class HabitStats:
+    # не строка asyncpg: считается в Python из битовых карт (fetch_habit_stats);
+    # доступ, как у Row, и по ключу, и по атрибуту
+    __slots__ = (
+        "id", "title", "total", "current_streak", "longest_streak", "completion_rate", "weekdays",
+    )
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __repr__(self):
+        return f"<HabitStats {self.as_dict()}>"
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class DailyActivity(Row):
+    __slots__ = ()
+
+    date: date
+    completions: int
+    active_habits: int
+
+
+class ActivityTotals(Row):
+    __slots__ = ()
+
+    week: int
+    month: int
+    year: int
+
+
+class ExportRow(Row):
+    __slots__ = ()
+
+    telegram_id: int
+    habit_id: int
+    title: str
+    created_at: object
+    date: date
+
+
+class OutboxItem(Row):
+    __slots__ = ()
+
+    id: int
+    telegram_id: int
+    day: date
+
+
+# ---------- пользователи ----------
+
+ENSURE_USER = """
+    INSERT INTO users (telegram_id, username) VALUES ($1, $2)
+    ON CONFLICT (telegram_id) DO NOTHING
+"""
+
+
+async def ensure_user(db, telegram_id, username=None):
+    await db.execute(ENSURE_USER, telegram_id, username)
+
+
+SET_TIMEZONE = """
+    UPDATE users SET timezone_offset = $2 WHERE telegram_id = $1
+    RETURNING telegram_id, reminder_time, timezone_offset
+"""
+
+SET_REMINDER_TIME = """
+    UPDATE users SET reminder_time = $2 WHERE telegram_id = $1
+    RETURNING telegram_id, reminder_time, timezone_offset
+"""
+
+
+async def set_timezone(db, telegram_id, offset):
+    # None, если пользователя нет
+    return await db.fetchrow(SET_TIMEZONE, telegram_id, offset, record_class=ReminderSettings)
+
+
+async def set_reminder_time(db, telegram_id, reminder_time):
+    return await db.fetchrow(SET_REMINDER_TIME, telegram_id, reminder_time, record_class=ReminderSettings)
+
+
+# ---------- привычки ----------
+
+# сохранённая серия «протухает», если вчера и сегодня отметок не было
+FETCH_HABITS = """
+    SELECT h.id, h.title,
+        CASE WHEN h.last_completed >= CURRENT_DATE - 1 THEN h.streak ELSE 0 END AS streak
+    FROM habits h
+    JOIN users u ON h.user_id = u.id
+    WHERE u.telegram_id = $1 AND h.is_active = TRUE
+    ORDER BY h.id
+"""
+
+
+async def fetch_habits(db, telegram_id):
+    return await db.fetch(FETCH_HABITS, telegram_id, record_class=Habit)
+
+
+# active_habits в дневном агрегате — как в DELETE_HABIT: подзапрос видит
+# снимок до INSERT, поэтому активных на одну больше
+ADD_HABIT = """
+    WITH added AS (
+        INSERT INTO habits (user_id, title)
+        SELECT id, $2 FROM users WHERE telegram_id = $1
+        RETURNING id, user_id, title, streak
+    ),
+    rollup AS (
+        INSERT INTO daily_activity (user_id, date, active_habits)
+        SELECT user_id, $3, (
+            SELECT COUNT(*) + 1 FROM habits
+            WHERE habits.user_id = added.user_id AND is_active = TRUE
+        )
+        FROM added
+        ON CONFLICT (user_id, date) DO UPDATE
+        SET active_habits = EXCLUDED.active_habits
+    )
+    SELECT id, title, streak FROM added
+"""
+
+
+async def add_habit(db, telegram_id, title, day=None):
+    # None, если пользователь ещё не нажимал /start
+    return await db.fetchrow(ADD_HABIT, telegram_id, title, day or date.today(), record_class=Habit)
+
+
+# мягкое удаление; возвращает telegram_id владельца.
+# Подзапрос видит снимок до UPDATE, поэтому активных на одну меньше.
+DELETE_HABIT = """
+    WITH deleted AS (
+        UPDATE habits h SET is_active = FALSE
+        FROM users u
+        WHERE h.id = $1 AND u.id = h.user_id AND h.is_active = TRUE
+        RETURNING h.user_id, u.telegram_id
+    ),
+    rollup AS (
+        INSERT INTO daily_activity (user_id, date, active_habits)
+        SELECT user_id, $2, (
+            SELECT COUNT(*) - 1 FROM habits
+            WHERE habits.user_id = deleted.user_id AND is_active = TRUE
+        )
+        FROM deleted
+        ON CONFLICT (user_id, date) DO UPDATE
+        SET active_habits = EXCLUDED.active_habits
+    )
+    SELECT telegram_id FROM deleted
+"""
+
+
+async def delete_habit(db, habit_id, day=None):
+    return await db.fetchval(DELETE_HABIT, habit_id, day or date.today())
+
+
+# Отметка выполнения за один round trip: лог вставляется с опорой на
+# UNIQUE (habit_id, date), серия пересчитывается только если лог новый.
+# FOR UPDATE сериализует двойные нажатия: второе дождётся первого,
+# упрётся в ON CONFLICT и вернёт уже обновлённую серию.
+# Новая отметка сразу попадает в дневной агрегат daily_activity.
+COMPLETE_HABIT = """
+    WITH habit AS (
+        SELECT id, user_id, title, streak, last_completed
+        FROM habits
+        WHERE id = $1 AND is_active = TRUE
+        FOR UPDATE
+    ),
+    log AS (
+        INSERT INTO habit_logs (habit_id, date)
+        SELECT id, $2 FROM habit
+        ON CONFLICT (habit_id, date) DO NOTHING
+        RETURNING habit_id
+    ),
+    updated AS (
+        UPDATE habits h
+        SET streak = CASE
+                WHEN habit.last_completed = $2 THEN habit.streak
+                WHEN habit.last_completed = $2 - 1 THEN habit.streak + 1
+                ELSE 1
+            END,
+            last_completed = $2
+        FROM habit, log
+        WHERE h.id = habit.id
+        RETURNING h.streak
+    ),
+    rollup AS (
+        INSERT INTO daily_activity (user_id, date, completions, active_habits)
+        SELECT habit.user_id, $2, 1, (
+            SELECT COUNT(*) FROM habits
+            WHERE habits.user_id = habit.user_id AND is_active = TRUE
+        )
+        FROM habit, log
+        ON CONFLICT (user_id, date) DO UPDATE
+        SET completions = daily_activity.completions + 1,
+            active_habits = EXCLUDED.active_habits
+    )
+    SELECT
+        $1::int AS id,
+        (SELECT title FROM habit) AS title,
+        EXISTS (SELECT 1 FROM habit) AS found,
+        EXISTS (SELECT 1 FROM log) AS created,
+        COALESCE((SELECT streak FROM updated), (SELECT streak FROM habit)) AS streak,
+        (SELECT u.telegram_id FROM habit JOIN users u ON u.id = habit.user_id) AS telegram_id
+"""
+
+
+async def complete_habit(db, habit_id, day=None):
+    row = await db.fetchrow(COMPLETE_HABIT, habit_id, day or date.today(), record_class=Completion)
+    if not row["found"]:
+        return None
+    return row
+
+
+# ---------- статистика ----------
+
+FETCH_DAILY_ACTIVITY = """
+    SELECT a.date, a.completions, a.active_habits
+    FROM daily_activity a
+    JOIN users u ON u.id = a.user_id
+    WHERE u.telegram_id = $1 AND a.date BETWEEN $2 AND $3
+    ORDER BY a.date
+"""
+
+
+async def fetch_daily_activity(db, telegram_id, start, end):
+    return await db.fetch(FETCH_DAILY_ACTIVITY, telegram_id, start, end, record_class=DailyActivity)
+
+
+ACTIVITY_TOTALS = """
+    SELECT
+        COALESCE(SUM(a.completions) FILTER (WHERE a.date > $2::date - 7), 0) AS week,
+        COALESCE(SUM(a.completions) FILTER (WHERE a.date > $2::date - 30), 0) AS month,
+        COALESCE(SUM(a.completions), 0) AS year
+    FROM daily_activity a
+    JOIN users u ON u.id = a.user_id
+    WHERE u.telegram_id = $1 AND a.date > $2::date - 365 AND a.date <= $2::date
+"""
+
+
+async def fetch_activity_totals(db, telegram_id, today=None):
+    return await db.fetchrow(ACTIVITY_TOTALS, telegram_id, today or date.today(), record_class=ActivityTotals)
+
+
+# active_habits за прошлый день восстанавливается приближённо: привычки,
+# созданные к этому дню и не удалённые сейчас. Общий подзапрос пересчёта
+# (rollup.py) и импорта: день — l.date, пользователь — h.user_id
+ACTIVE_HABITS_ON_DAY = """(
+        SELECT COUNT(*) FROM habits a
+        WHERE a.user_id = h.user_id
+        AND a.is_active = TRUE
+        AND (a.created_at IS NULL OR a.created_at::date <= l.date)
+    )"""
+
+MAX_USER_ID = "SELECT COALESCE(MAX(id), 0) FROM users"
+
+# daily_activity заново по всем отметкам пользователей с id из [$1, $2)
+BACKFILL_DAILY_ACTIVITY = """
+    INSERT INTO daily_activity (user_id, date, completions, active_habits)
+    SELECT h.user_id, l.date, COUNT(*), """ + ACTIVE_HABITS_ON_DAY + """
+    FROM habit_days l
+    JOIN habits h ON h.id = l.habit_id
+    WHERE h.user_id >= $1 AND h.user_id < $2
+    GROUP BY h.user_id, l.date
+    ON CONFLICT (user_id, date) DO UPDATE
+    SET completions = EXCLUDED.completions,
+        active_habits = EXCLUDED.active_habits
+"""
+
+
+async def max_user_id(db):
+    return await db.fetchval(MAX_USER_ID)
+
+
+async def backfill_daily_activity(db, first_user_id, end_user_id):
+    # сколько строк daily_activity записано
+    status = await db.execute(BACKFILL_DAILY_ACTIVITY, first_user_id, end_user_id)
+    return int(status.split()[-1])
+
+
+# Вся аналитика по активным привычкам пользователя одним запросом: свёрнутые
+# годы приходят готовыми битовыми картами (строка на год вместо сотен дат),
+# из habit_logs — только отметки незакрытых лет; серии, дни недели и доля
+# считаются в utils/analytics.HabitHistory.
+HABIT_STATS = """
+    SELECT h.id, h.title, h.created_at,
+        ARRAY(SELECT y.year FROM habit_log_years y WHERE y.habit_id = h.id ORDER BY y.year) AS years,
+        ARRAY(SELECT y.days FROM habit_log_years y WHERE y.habit_id = h.id ORDER BY y.year) AS bitmaps,
+        ARRAY(SELECT l.date FROM habit_logs l WHERE l.habit_id = h.id AND l.date <= $2 ORDER BY l.date) AS dates
+    FROM habits h
+    JOIN users u ON u.id = h.user_id
+    WHERE u.telegram_id = $1 AND h.is_active = TRUE
+    ORDER BY h.id
+"""
+
+
+def _habit_stats(row, today, window_days):
+    history = HabitHistory.from_parts(zip(row["years"], row["bitmaps"]), row["dates"], today)
+    # с первого дня привычки: создания или первой отметки (импорт задним числом)
+    created = row["created_at"].date() if row["created_at"] else None
+    start = min(filter(None, (created, history.first_day())), default=today)
+    span = max(1, min(window_days, (today - start).days + 1))
+
+    return HabitStats(
+        id=row["id"],
+        title=row["title"],
+        total=len(history),
+        current_streak=history.current_streak(today),
+        longest_streak=history.longest_streak(),
+        completion_rate=history.count(today - timedelta(days=window_days - 1), today) / span,
+        weekdays=history.weekday_counts(),
+    )
+
+
+async def fetch_habit_stats(db, telegram_id, today=None, window_days=30):
+    # completion_rate — доля дней с отметкой за последние window_days
+    # (или с момента создания привычки, если она моложе)
+    today = today or date.today()
+    rows = await db.fetch(HABIT_STATS, telegram_id, today)
+    return [_habit_stats(r, today, window_days) for r in rows]
+
+
+# ---------- обслуживание habit_logs ----------
+
+# функции — в migrations/006_partition_habit_logs.sql
+ENSURE_PARTITIONS = "SELECT ensure_habit_log_partitions($1)"
+
+# закрытые годы, у которых остались строки в habit_logs
+COMPACTABLE_YEARS = """
+    SELECT DISTINCT EXTRACT(YEAR FROM date)::int AS year
+    FROM habit_logs
+    WHERE date < date_trunc('year', CURRENT_DATE)
+    ORDER BY year
+"""
+
+COMPACT_YEAR = "SELECT compact_habit_logs($1)"
+
+
+async def ensure_partitions(db, months_ahead=3):
+    return await db.fetchval(ENSURE_PARTITIONS, months_ahead)
+
+
+async def compactable_years(db):
+    return [r["year"] for r in await db.fetch(COMPACTABLE_YEARS)]
+
+
+async def compact_year(db, year):
+    # сколько строк habit_logs свёрнуто в habit_log_years
+    async with db.transaction():
+        return await db.fetchval(COMPACT_YEAR, year)
+
+
+# ---------- напоминания ----------
+
+FETCH_REMINDER_SETTINGS = """
+    SELECT telegram_id, reminder_time, timezone_offset
+    FROM users
+    WHERE reminder_time IS NOT NULL
+"""
+
+
+async def fetch_reminder_settings(db):
+    return await db.fetch(FETCH_REMINDER_SETTINGS, record_class=ReminderSettings)
+
+
+# вся минутная корзина одним INSERT; реплики кладут одно и то же — дубли отсекает UNIQUE.
+# Колесо реплики, не видевшей /reminder или /timezone, держит старую минуту:
+# кладём только тех, у кого текущие настройки в БД дают именно $2
+ENQUEUE_REMINDERS = """
+    INSERT INTO reminder_outbox (telegram_id, day, due_at)
+    SELECT telegram_id, $2::timestamp::date, $2
+    FROM users
+    WHERE telegram_id = ANY($1::bigint[])
+    AND reminder_time IS NOT NULL
+    AND ((EXTRACT(HOUR FROM reminder_time)::int * 60
+          + EXTRACT(MINUTE FROM reminder_time)::int
+          - COALESCE(timezone_offset, 0) * 60) % 1440 + 1440) % 1440
+        = EXTRACT(HOUR FROM $2::timestamp)::int * 60 + EXTRACT(MINUTE FROM $2::timestamp)::int
+    AND last_reminder IS DISTINCT FROM $2::timestamp::date
+    ON CONFLICT (telegram_id, day) DO NOTHING
+    RETURNING telegram_id
+"""
+
+
+async def enqueue_reminders(db, telegram_ids, due_at):
+    # due_at — минута срабатывания (UTC) из колеса
+    return len(await db.fetch(ENQUEUE_REMINDERS, telegram_ids, due_at))
+
+
+# напоминания, чья минута (UTC) прошла за последние $2 минут, пока процесс лежал
+ENQUEUE_MISSED_REMINDERS = """
+    INSERT INTO reminder_outbox (telegram_id, day, due_at)
+    SELECT u.telegram_id, f.at::date, f.at
+    FROM users u
+    CROSS JOIN LATERAL (
+        SELECT d + make_interval(mins => (
+            (EXTRACT(HOUR FROM u.reminder_time)::int * 60
+             + EXTRACT(MINUTE FROM u.reminder_time)::int
+             - COALESCE(u.timezone_offset, 0) * 60) % 1440 + 1440
+        ) % 1440) AS at
+        FROM (VALUES ($1::timestamp::date - 1), ($1::timestamp::date)) AS days(d)
+    ) f
+    WHERE u.reminder_time IS NOT NULL
+    AND f.at > $1::timestamp - make_interval(mins => $2::int)
+    AND f.at <= $1::timestamp
+    AND u.last_reminder IS DISTINCT FROM f.at::date
+    ON CONFLICT (telegram_id, day) DO NOTHING
+    RETURNING telegram_id
+"""
+
+
+async def enqueue_missed_reminders(db, utc_now, minutes):
+    return len(await db.fetch(ENQUEUE_MISSED_REMINDERS, utc_now, minutes))
+
+
+# пачка уходит в аренду на $2 секунд; упавший воркер её не держит вечно
+CLAIM_REMINDERS = """
+    UPDATE reminder_outbox
+    SET claimed_until = NOW() + make_interval(secs => $2::float8),
+        attempts = attempts + 1
+    WHERE id IN (
+        SELECT id FROM reminder_outbox
+        WHERE sent_at IS NULL
+        AND (claimed_until IS NULL OR claimed_until < NOW())
+        AND attempts < $3
+        ORDER BY due_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, telegram_id, day
+"""
+
+
+async def claim_reminders(db, limit, lease, max_attempts):
+    return await db.fetch(CLAIM_REMINDERS, limit, lease, max_attempts, record_class=OutboxItem)
+
+
+ACK_REMINDERS = """
+    WITH done AS (
+        UPDATE reminder_outbox o
+        SET sent_at = NOW(), claimed_until = NULL, error = a.error
+        FROM unnest($1::bigint[], $2::text[]) AS a(id, error)
+        WHERE o.id = a.id
+        RETURNING o.telegram_id, o.day
+    )
+    UPDATE users u SET last_reminder = done.day
+    FROM done
+    WHERE u.telegram_id = done.telegram_id
+"""
+
+
+async def ack_reminders(db, sent, failed=()):
+    # sent — отправленные id, failed — [(id, ошибка)], которые повторять бессмысленно
+    ids = list(sent) + [i for i, _ in failed]
+    errors = [None] * len(sent) + [e for _, e in failed]
+    if ids:
+        await db.execute(ACK_REMINDERS, ids, errors)
+
+
+# временная ошибка — вернуть в очередь не раньше чем через $2 секунд
+RELEASE_REMINDERS = """
+    UPDATE reminder_outbox
+    SET claimed_until = NOW() + make_interval(secs => $2::float8)
+    WHERE id = ANY($1::bigint[])
+"""
+
+
+async def release_reminders(db, ids, delay):
+    if ids:
+        await db.execute(RELEASE_REMINDERS, list(ids), delay)
+
+
+PURGE_REMINDERS = """
+    DELETE FROM reminder_outbox WHERE day < CURRENT_DATE - $1::int
+"""
+
+
+async def purge_reminders(db, keep_days):
+    await db.execute(PURGE_REMINDERS, keep_days)
+
+
+# ---------- экспорт и импорт ----------
+
+# привычка без отметок выгружается одной строкой с пустой датой
+EXPORT_HABITS = """
+    SELECT u.telegram_id, h.id AS habit_id, h.title, h.created_at, l.date
+    FROM habits h
+    JOIN users u ON u.id = h.user_id
+    LEFT JOIN LATERAL habit_days_of(h.id) l ON TRUE
+    WHERE h.is_active = TRUE
+    AND ($1::bigint IS NULL OR u.telegram_id = $1)
+    ORDER BY u.telegram_id, h.id, l.date
+"""
+
+
+async def iter_export(db, telegram_id=None, chunk=1000):
+    # серверный курсор в одном снимке: память не зависит от размера истории
+    async with db.transaction(isolation="repeatable_read", readonly=True):
+        cursor = await db.cursor(EXPORT_HABITS, telegram_id, record_class=ExportRow)
+        while rows := await cursor.fetch(chunk):
+            yield rows
+
+
+IMPORT_COLUMNS = ["telegram_id", "title", "created_at", "date"]
+
+CREATE_IMPORT_TABLES = """
+    CREATE TEMP TABLE habit_import (
+        telegram_id BIGINT NOT NULL,
+        title TEXT NOT NULL,
+        created_at TIMESTAMP,
+        date DATE
+    ) ON COMMIT DROP;
+    CREATE TEMP TABLE habit_import_logs (
+        habit_id INT NOT NULL,
+        date DATE NOT NULL
+    ) ON COMMIT DROP;
+    SET LOCAL habits.mute_events = 'on';
+"""
+
+IMPORT_USERS = """
+    INSERT INTO users (telegram_id)
+    SELECT DISTINCT telegram_id FROM habit_import
+    ON CONFLICT (telegram_id) DO NOTHING
+"""
+
+# привычка сопоставляется по названию среди активных; новая получает
+# created_at не позже первой отметки, чтобы статистика считала её дни
+IMPORT_HABITS = """
+    INSERT INTO habits (user_id, title, created_at)
+    SELECT u.id, i.title, LEAST(MIN(i.created_at), MIN(i.date)::timestamp, NOW())
+    FROM habit_import i
+    JOIN users u ON u.telegram_id = i.telegram_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM habits h
+        WHERE h.user_id = u.id AND h.title = i.title AND h.is_active = TRUE
+    )
+    GROUP BY u.id, i.title
+"""
+
+# дубли внутри файла и с уже имеющимися отметками отсекает UNIQUE (habit_id, date),
+# с уже свёрнутыми годами — проверка бита; будущие даты пропускаем —
+# по ним нельзя посчитать серию
+IMPORT_LOGS = """
+    WITH inserted AS (
+        INSERT INTO habit_logs (habit_id, date)
+        SELECT DISTINCT h.id, i.date
+        FROM habit_import i
+        JOIN users u ON u.telegram_id = i.telegram_id
+        CROSS JOIN LATERAL (
+            SELECT id FROM habits
+            WHERE user_id = u.id AND title = i.title AND is_active = TRUE
+            ORDER BY id
+            LIMIT 1
+        ) h
+        WHERE i.date IS NOT NULL AND i.date <= CURRENT_DATE
+        AND NOT EXISTS (
+            SELECT 1 FROM habit_log_years y
+            WHERE y.habit_id = h.id AND y.year = EXTRACT(YEAR FROM i.date)
+            AND get_bit(y.days, i.date - make_date(y.year, 1, 1)) = 1
+        )
+        ON CONFLICT (habit_id, date) DO NOTHING
+        RETURNING habit_id, date
+    )
+    INSERT INTO habit_import_logs SELECT habit_id, date FROM inserted
+"""
+
+# серия — длина последнего непрерывного отрезка отметок (gaps-and-islands),
+# как её ведёт complete_habit
+IMPORT_STREAKS = """
+    WITH logs AS (
+        SELECT t.habit_id, l.date,
+            l.date - ROW_NUMBER() OVER (PARTITION BY t.habit_id ORDER BY l.date)::int AS island
+        FROM (SELECT DISTINCT habit_id FROM habit_import_logs) t
+        CROSS JOIN LATERAL habit_days_of(t.habit_id) l
+    ),
+    last AS (
+        SELECT DISTINCT ON (habit_id) habit_id, island, date
+        FROM logs
+        ORDER BY habit_id, date DESC
+    )
+    UPDATE habits h
+    SET last_completed = last.date,
+        streak = (
+            SELECT COUNT(*) FROM logs
+            WHERE logs.habit_id = last.habit_id AND logs.island = last.island
+        )
+    FROM last
+    WHERE h.id = last.habit_id
+"""
+
+# active_habits за прошлые дни — приближённо, тем же подзапросом, что и пересчёт
+IMPORT_DAILY_ACTIVITY = """
+    INSERT INTO daily_activity (user_id, date, completions, active_habits)
+    SELECT h.user_id, l.date, COUNT(*), """ + ACTIVE_HABITS_ON_DAY + """
+    FROM habit_import_logs l
+    JOIN habits h ON h.id = l.habit_id
+    GROUP BY h.user_id, l.date
+    ON CONFLICT (user_id, date) DO UPDATE
+    SET completions = daily_activity.completions + EXCLUDED.completions,
+        active_habits = GREATEST(daily_activity.active_habits, EXCLUDED.active_habits)
+"""
+
+# триггер на время импорта заглушён — открытым мини-аппам одно событие на пользователя
+IMPORT_NOTIFY = """
+    SELECT pg_notify('habit_changes', json_build_object('telegram_id', telegram_id, 'op', 'reload')::text)
+    FROM (SELECT DISTINCT telegram_id FROM habit_import) t
+"""
+
+
+async def import_habit_logs(db, batches):
+    # batches — async-итератор списков (telegram_id, title, created_at, date);
+    # всё в одной транзакции: либо файл целиком, либо ничего
+    rows = 0
+    async with db.transaction():
+        await db.execute(CREATE_IMPORT_TABLES)
+        async for batch in batches:
+            await db.copy_records_to_table("habit_import", records=batch, columns=IMPORT_COLUMNS)
+            rows += len(batch)
+
+        await db.execute("ANALYZE habit_import")
+        await db.execute(IMPORT_USERS)
+        habits = int((await db.execute(IMPORT_HABITS)).split()[-1])
+        logs = int((await db.execute(IMPORT_LOGS)).split()[-1])
+        await db.execute(IMPORT_STREAKS)
+        await db.execute(IMPORT_DAILY_ACTIVITY)
+        await db.execute(IMPORT_NOTIFY)
+
+    return {"rows": rows, "habits": habits, "logs": logs}
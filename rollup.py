@@ -0,0 +1,37 @@
+import asyncio
+import sys
+
+import repository
+from database import init_pool, close_pool, get_db
+
+# пересчёт идёт пачками пользователей, чтобы не держать одну огромную транзакцию
+BATCH_USERS = 1000
+
+
+async def backfill(db, batch_users=BATCH_USERS):
+    # запрос — repository.BACKFILL_DAILY_ACTIVITY
+    max_user_id = await repository.max_user_id(db)
+    rows = 0
+
+    for start in range(0, max_user_id + 1, batch_users):
+        async with db.transaction():
+            rows += await repository.backfill_daily_activity(db, start, start + batch_users)
+
+    return rows
+
+
+async def main():
+    batch_users = int(sys.argv[1]) if len(sys.argv) > 1 else BATCH_USERS
+
+    await init_pool()
+    try:
+        async with get_db() as db:
+            rows = await backfill(db, batch_users)
+    finally:
+        await close_pool()
+
+    print(f"✅ daily_activity: {rows} rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
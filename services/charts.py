@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from config import CHART_WORKERS, CHART_CACHE_SIZE
+from utils.cache import LRUCache
+from utils import charts as plots
+
+_executor = None
+
+# key -> {"png": bytes, "file_id": str | None}
+_cache = LRUCache(CHART_CACHE_SIZE)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=CHART_WORKERS)
+    return _executor
+
+
+def cache_key(user_id, start, end, data):
+    fingerprint = hashlib.sha1(repr(data).encode()).hexdigest()
+    return (user_id, start, end, fingerprint)
+
+
+def get(key):
+    return _cache.get(key)
+
+
+async def render(key, func, *args):
+    entry = _cache.get(key)
+    if entry is not None:
+        return entry["png"]
+
+    loop = asyncio.get_running_loop()
+    png = await loop.run_in_executor(_get_executor(), func, *args)
+    _cache.set(key, {"png": png, "file_id": None})
+    return png
+
+
+def remember_file_id(key, file_id):
+    # повторно отправлять уже загруженное в Telegram фото по file_id
+    entry = _cache.get(key)
+    if entry is not None:
+        entry["file_id"] = file_id
+
+
+async def warm_up():
+    # поднять процессы пула и импортировать в них matplotlib заранее:
+    # по задаче на процесс, пока все заняты — пул добавляет новые
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    await asyncio.gather(*[
+        loop.run_in_executor(executor, plots.warm_up) for _ in range(CHART_WORKERS)
+    ])
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import asyncpg
+
+from config import DATABASE_URL
+from utils import metrics
+
+CHANNEL = "habit_changes"
+
+# событий в очереди одного подписчика; кто не успевает читать — отключается
+# и, переподключившись, перечитывает список целиком
+SUBSCRIBER_QUEUE_SIZE = 100
+
+SUBSCRIBERS = metrics.Gauge(
+    "habits_event_subscribers", "Открытых подписок на ленту изменений"
+)
+
+
+# Одно LISTEN-соединение на процесс (вне пула: LISTEN живёт, пока живо
+# соединение) и раздача NOTIFY по подпискам конкретного telegram_id.
+class ChangeFeed:
+    def __init__(self, dsn=DATABASE_URL, reconnect_delay=5):
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self.subscribers = {}
+        # handler(telegram_id, event) на каждое событие, даже без подписчиков
+        # (сброс кэшей); после переподключения — с telegram_id=None: сбросить всё
+        self.handlers = []
+        self.db = None
+        self.task = None
+
+    def on_change(self, handler):
+        self.handlers.append(handler)
+        return handler
+
+    async def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        self.close_all()
+
+    def close_all(self):
+        # завершить все потоки: клиенты переподключатся (к другой реплике)
+        for queues in self.subscribers.values():
+            for queue in queues:
+                self._close(queue)
+
+    async def _run(self):
+        while True:
+            lost = asyncio.Event()
+            try:
+                self.db = await asyncpg.connect(self.dsn)
+                self.db.add_termination_listener(lambda db: lost.set())
+                await self.db.add_listener(CHANNEL, self._notify)
+                # пока не слушали, события терялись: пусть клиенты перечитают
+                self._broadcast({"op": "reload"})
+                await lost.wait()
+                print("Change feed: connection lost")
+            except asyncio.CancelledError:
+                if self.db is not None:
+                    await self.db.close()
+                raise
+            except Exception as e:
+                metrics.ERRORS.inc("events")
+                print("Change feed error:", e)
+            self.db = None
+            await asyncio.sleep(self.reconnect_delay)
+
+    def _notify(self, db, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        telegram_id = event.get("telegram_id")
+        if telegram_id is None:
+            return
+
+        for handler in self.handlers:
+            handler(telegram_id, event)
+        for queue in list(self.subscribers.get(telegram_id, ())):
+            self._put(telegram_id, queue, event)
+
+    def _broadcast(self, event):
+        for handler in self.handlers:
+            handler(None, event)
+        for telegram_id, queues in list(self.subscribers.items()):
+            for queue in list(queues):
+                self._put(telegram_id, queue, event)
+
+    def _put(self, telegram_id, queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.unsubscribe(telegram_id, queue)
+            self._close(queue)
+
+    @staticmethod
+    def _close(queue):
+        # None — конец потока: недочитанное уже не нужно
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def subscribe(self, telegram_id):
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.setdefault(telegram_id, set()).add(queue)
+        SUBSCRIBERS.set(sum(len(q) for q in self.subscribers.values()))
+        return queue
+
+    def unsubscribe(self, telegram_id, queue):
+        queues = self.subscribers.get(telegram_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[telegram_id]
+        SUBSCRIBERS.set(sum(len(q) for q in self.subscribers.values()))
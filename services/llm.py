@@ -1,13 +1,95 @@
-from openai import AsyncOpenAI
-from config import OPENAI_API_KEY
+import asyncio
+import hashlib
+import importlib
+import time
+
+from config import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_MODEL,
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_TTL,
+)
+from utils.cache import LRUCache
+from utils import metrics
+
+_client = None
+_semaphore = asyncio.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+# sha256(prompt) -> ответ; одинаковые данные привычек не оплачиваются дважды
+_cache = LRUCache(LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+
+# одинаковые запросы, пришедшие одновременно, ждут один и тот же вызов
+_inflight = {}
+
+
+def get_client():
+    global _client
+    if _client is None:
+        # SDK импортируется почти секунду, а нужен только AI-анализу:
+        # грузим при первом запросе (или в фоне, см. warm_up)
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL or None,
+            timeout=LLM_TIMEOUT,
+            max_retries=1,
+        )
+    return _client
+
+
+def warm_up():
+    # зовётся в потоке после старта бота, чтобы первый AI-анализ не ждал импорта;
+    # сам клиент всё равно создаётся при первом запросе, уже в цикле событий
+    if OPENAI_API_KEY:
+        importlib.import_module("openai")
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()
+
+
+async def _complete(key: str, prompt: str) -> str:
+    async with _semaphore:
+        # пока ждали слот, такой же запрос мог уже выполниться
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            response = await get_client().chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.4,
+                max_tokens=500,
+            )
+        except Exception:
+            outcome = "error"
+            metrics.ERRORS.inc("llm")
+            raise
+        finally:
+            metrics.LLM_SECONDS.observe(time.perf_counter() - start, outcome)
+
+    answer = response.choices[0].message.content
+    _cache.set(key, answer)
+    return answer
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 async def ask_ai(prompt: str) -> str:
-    response = await client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.4,
-        max_tokens=300
-    )
-    return response.choices[0].message.content
+    key = prompt_key(prompt)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_complete(key, prompt))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    return await asyncio.wait_for(asyncio.shield(task), LLM_TIMEOUT)
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+import repository
+
+MINUTES_PER_DAY = 24 * 60
+
+# если планировщик проспал дольше, пропущенные минуты догоняет
+# repository.enqueue_missed_reminders при старте, а не колесо
+MAX_CATCHUP_MINUTES = 15
+
+
+def utc_fire_minute(reminder_time, timezone_offset):
+    local_minute = reminder_time.hour * 60 + reminder_time.minute
+    return (local_minute - (timezone_offset or 0) * 60) % MINUTES_PER_DAY
+
+
+# 1440 минутных корзин: в каждой — telegram_id тех, у кого
+# напоминание срабатывает в эту минуту по UTC
+class ReminderWheel:
+    def __init__(self):
+        self.buckets = [set() for _ in range(MINUTES_PER_DAY)]
+        self.slots = {}
+        self.last_tick = None
+
+    def __len__(self):
+        return len(self.slots)
+
+    def schedule(self, telegram_id, reminder_time, timezone_offset):
+        self.cancel(telegram_id)
+        if reminder_time is None:
+            return
+
+        minute = utc_fire_minute(reminder_time, timezone_offset)
+        self.buckets[minute].add(telegram_id)
+        self.slots[telegram_id] = minute
+
+    def cancel(self, telegram_id):
+        minute = self.slots.pop(telegram_id, None)
+        if minute is not None:
+            self.buckets[minute].discard(telegram_id)
+
+    async def load(self, db):
+        rows = await repository.fetch_reminder_settings(db)
+
+        for bucket in self.buckets:
+            bucket.clear()
+        self.slots.clear()
+
+        for r in rows:
+            self.schedule(r["telegram_id"], r["reminder_time"], r["timezone_offset"])
+
+    def due(self, utc_now):
+        # {минута UTC: [telegram_id]} с прошлого тика по текущую включительно
+        minute = utc_now.replace(second=0, microsecond=0)
+        step = timedelta(minutes=1)
+
+        if self.last_tick is not None and minute <= self.last_tick:
+            return {}
+
+        if self.last_tick is None or minute - self.last_tick > step * MAX_CATCHUP_MINUTES:
+            start = minute
+        else:
+            start = self.last_tick + step
+
+        result = {}
+        t = start
+        while t <= minute:
+            bucket = self.buckets[t.hour * 60 + t.minute]
+            if bucket:
+                result[t] = list(bucket)
+            t += step
+
+        self.last_tick = minute
+        return result
@@ -0,0 +1,110 @@
+import asyncio
+import time
+
+import aiogram
+from aiogram.dispatcher.handler import current_handler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.utils.exceptions import RetryAfter, NetworkError, RestartingTelegram
+
+from config import (
+    METRICS_ENABLED,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_CHAT_RATE,
+    TELEGRAM_CHAT_BURST,
+    TELEGRAM_MAX_RETRIES,
+)
+from utils import metrics
+from utils.ratelimit import RateLimiter
+
+# методы, которые Telegram считает сообщениями и ограничивает по частоте
+PACED_PREFIXES = ("send", "edit", "forward", "copy")
+
+
+def _rewind(files):
+    # BytesIO после неудачной попытки уже дочитан до конца
+    for f in (files or {}).values():
+        fileobj = getattr(f, "file", None) or (f[1] if isinstance(f, tuple) else f)
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+
+
+class Bot(aiogram.Bot):
+    # все исходящие вызовы Bot API проходят через request():
+    # здесь темп (~30 сообщений/с на бота, ~1/с на чат) и повторы после RetryAfter
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = RateLimiter(TELEGRAM_GLOBAL_RATE, TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST)
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        if not method.startswith(PACED_PREFIXES):
+            return await self._request(method, data, files, **kwargs)
+
+        chat_id = data.get("chat_id") if data else None
+        for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+            await self.limiter.acquire(chat_id)
+            try:
+                return await self._request(method, data, files, **kwargs)
+            except RetryAfter as e:
+                if attempt == TELEGRAM_MAX_RETRIES:
+                    raise
+                metrics.TELEGRAM_RETRIES.inc("retry_after")
+                if not self.limiter.pause(chat_id, e.timeout):
+                    await asyncio.sleep(e.timeout)
+            except (NetworkError, RestartingTelegram):
+                if attempt == TELEGRAM_MAX_RETRIES:
+                    raise
+                metrics.TELEGRAM_RETRIES.inc("network")
+                await asyncio.sleep(min(0.5 * 2 ** attempt, 30))
+            _rewind(files)
+
+    async def _request(self, method, data=None, files=None, **kwargs):
+        if not METRICS_ENABLED:
+            return await super().request(method, data, files, **kwargs)
+
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            return await super().request(method, data, files, **kwargs)
+        except Exception:
+            outcome = "error"
+            metrics.ERRORS.inc("telegram")
+            raise
+        finally:
+            metrics.TELEGRAM_SECONDS.observe(time.perf_counter() - start, method, outcome)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    # время хендлера от выбора по фильтрам до возврата, метка — имя функции
+
+    async def _start(self, data):
+        data["_metrics_handler"] = current_handler.get().__name__
+        data["_metrics_started"] = time.perf_counter()
+
+    async def _stop(self, data):
+        started = data.get("_metrics_started")
+        if started is not None:
+            metrics.HANDLER_SECONDS.observe(time.perf_counter() - started, data["_metrics_handler"])
+
+    async def on_process_message(self, message, data):
+        await self._start(data)
+
+    async def on_post_process_message(self, message, results, data):
+        await self._stop(data)
+
+    async def on_process_callback_query(self, callback, data):
+        await self._start(data)
+
+    async def on_post_process_callback_query(self, callback, results, data):
+        await self._stop(data)
+
+
+async def _count_error(update, exception):
+    metrics.ERRORS.inc("handler")
+
+
+def setup_metrics(dp):
+    if not METRICS_ENABLED:
+        return
+    dp.middleware.setup(MetricsMiddleware())
+    dp.register_errors_handler(_count_error)
@@ -0,0 +1,131 @@
+import asyncio
+
+from aiogram import Bot, Dispatcher
+
+from config import UPDATE_WORKERS, UPDATE_QUEUE_SIZE
+from utils import metrics
+
+# поля Update, в которых есть автор апдейта
+USER_FIELDS = (
+    "message",
+    "edited_message",
+    "callback_query",
+    "inline_query",
+    "chosen_inline_result",
+    "shipping_query",
+    "pre_checkout_query",
+    "poll_answer",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request",
+)
+
+
+def update_user_id(update):
+    for field in USER_FIELDS:
+        obj = getattr(update, field, None)
+        if obj is None:
+            continue
+        user = getattr(obj, "from_user", None) or getattr(obj, "user", None)
+        if user is not None:
+            return user.id
+    return update.update_id
+
+
+QUEUE_DEPTH = metrics.Gauge(
+    "habits_update_queue_depth", "Апдейтов в очереди шарда", ["shard"]
+)
+
+
+# Апдейты раскладываются по N очередям по telegram_id: у одного
+# пользователя они идут строго по порядку (двойное нажатие «✅»
+# обработается вторым и увидит первое), разные пользователи — параллельно.
+class UpdateShards:
+    def __init__(self, dp, workers=UPDATE_WORKERS, queue_size=UPDATE_QUEUE_SIZE):
+        self.dp = dp
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queues = []
+        self.room = []
+        self.tasks = []
+        # выставляется, когда разобран первый апдейт (для отчёта о старте)
+        self.first_update = asyncio.Event()
+
+    def start(self):
+        if self.tasks:
+            return
+        # воркеры наследуют контекст: хендлеры зовут Bot.get_current()
+        Bot.set_current(self.dp.bot)
+        Dispatcher.set_current(self.dp)
+
+        self.queues = [asyncio.Queue() for _ in range(self.workers)]
+        self.room = [asyncio.Event() for _ in range(self.workers)]
+        for i in range(self.workers):
+            self.room[i].set()
+            self.tasks.append(asyncio.create_task(self._worker(i)))
+        QUEUE_DEPTH.func = self.depth
+
+    def depth(self):
+        return {(str(i),): q.qsize() for i, q in enumerate(self.queues)}
+
+    async def submit(self, update):
+        i = update_user_id(update) % self.workers
+        queue, room = self.queues[i], self.room[i]
+
+        # кладём сразу, чтобы порядок не зависел от того, кто первым проснётся;
+        # ждём уже после — так давим на источник (getUpdates или вебхук)
+        queue.put_nowait(update)
+        while queue.qsize() > self.queue_size:
+            room.clear()
+            await room.wait()
+
+    async def _worker(self, i):
+        queue, room = self.queues[i], self.room[i]
+        while True:
+            update = await queue.get()
+            if queue.qsize() <= self.queue_size:
+                room.set()
+            try:
+                await self.dp.process_update(update)
+            except Exception as e:
+                print("Update error:", e)
+            finally:
+                queue.task_done()
+                self.first_update.set()
+
+    async def stop(self, timeout=10):
+        if not self.tasks:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*[q.join() for q in self.queues]), timeout
+            )
+        except asyncio.TimeoutError:
+            print("Updates left unprocessed:", sum(q.qsize() for q in self.queues))
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+
+async def poll(shards, timeout=20, error_sleep=5):
+    # long polling с одним читателем: пока очереди полны, getUpdates не зовём,
+    # и необработанные апдейты ждут на стороне Telegram
+    bot = shards.dp.bot
+    offset = None
+    while True:
+        try:
+            updates = await bot.get_updates(offset=offset, timeout=timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.ERRORS.inc("polling")
+            print("Polling error:", e)
+            await asyncio.sleep(error_sleep)
+            continue
+
+        for update in updates:
+            await shards.submit(update)
+        if updates:
+            offset = updates[-1].update_id + 1
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from datetime import date, datetime
+
+import repository
+from database import init_pool, close_pool, get_db
+
+# python transfer.py export --format ndjson --telegram-id 123 --out habits.ndjson
+# python transfer.py export > all.csv                      # вся база
+# python transfer.py import habits.csv [--telegram-id 123]
+#
+# Формат строки: telegram_id, habit_id, title, created_at, date — по строке на
+# отметку, привычка без отметок — строка с пустой датой. При импорте нужны
+# только title и date (+ telegram_id, если не задан --telegram-id),
+# так что подойдёт и выгрузка из другого трекера с такими колонками.
+
+FIELDS = ["telegram_id", "habit_id", "title", "created_at", "date"]
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+EXPORT_CHUNK = 1000
+IMPORT_BATCH = 10000
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _csv_chunk(rows, header=False):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(FIELDS)
+    writer.writerows([_iso(r[f]) for f in FIELDS] for r in rows)
+    return buf.getvalue().encode()
+
+
+def _ndjson_chunk(rows):
+    lines = [json.dumps({f: _iso(r[f]) for f in FIELDS}, ensure_ascii=False) for r in rows]
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def export_chunks(db, fmt, telegram_id=None):
+    # байтовые куски по EXPORT_CHUNK строк — для StreamingResponse и файла
+    first = True
+    async for rows in repository.iter_export(db, telegram_id, EXPORT_CHUNK):
+        yield _csv_chunk(rows, header=first) if fmt == "csv" else _ndjson_chunk(rows)
+        first = False
+
+    if first and fmt == "csv":
+        yield _csv_chunk([], header=True)
+
+
+def _parse_row(row, telegram_id):
+    title = (row.get("title") or "").strip()
+    if not title:
+        raise ValueError("empty title")
+
+    tid = telegram_id or int(row["telegram_id"])
+    created_at = row.get("created_at") or None
+    day = row.get("date") or None
+    return (
+        tid,
+        title,
+        datetime.fromisoformat(created_at) if created_at else None,
+        date.fromisoformat(day[:10]) if day else None,
+    )
+
+
+def read_rows(f, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(f)
+    else:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def import_file(db, f, fmt, telegram_id=None, batch_size=IMPORT_BATCH):
+    skipped = 0
+
+    async def batches():
+        nonlocal skipped
+        batch = []
+        for n, row in enumerate(read_rows(f, fmt), 1):
+            try:
+                batch.append(_parse_row(row, telegram_id))
+            except (KeyError, TypeError, ValueError) as e:
+                skipped += 1
+                print(f"line {n}: skipped ({e})", file=sys.stderr)
+                continue
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    result = await repository.import_habit_logs(db, batches())
+    result["skipped"] = skipped
+    return result
+
+
+def guess_format(path, fmt):
+    if fmt:
+        return fmt
+    return "ndjson" if path and path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python transfer.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="выгрузить привычки и отметки")
+    p.add_argument("--telegram-id", type=int, help="только этот пользователь (по умолчанию все)")
+    p.add_argument("--format", choices=list(CONTENT_TYPES))
+    p.add_argument("--out", help="файл (по умолчанию stdout)")
+
+    p = sub.add_parser("import", help="загрузить отметки из CSV/NDJSON")
+    p.add_argument("file")
+    p.add_argument("--telegram-id", type=int, help="владелец всех строк файла")
+    p.add_argument("--format", choices=list(CONTENT_TYPES))
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    fmt = guess_format(args.out if args.command == "export" else args.file, args.format)
+
+    await init_pool()
+    try:
+        async with get_db() as db:
+            if args.command == "export":
+                out = open(args.out, "wb") if args.out else sys.stdout.buffer
+                try:
+                    async for chunk in export_chunks(db, fmt, args.telegram_id):
+                        out.write(chunk)
+                finally:
+                    if args.out:
+                        out.close()
+            else:
+                with open(args.file, encoding="utf-8", newline="") as f:
+                    result = await import_file(db, f, fmt, args.telegram_id)
+                print(
+                    f"✅ rows: {result['rows']}, new habits: {result['habits']}, "
+                    f"new logs: {result['logs']}, skipped: {result['skipped']}",
+                    file=sys.stderr,
+                )
+    finally:
+        await close_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
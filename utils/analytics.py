@@ -1,23 +1,229 @@
-from collections import Counter
-from datetime import timedelta
+from datetime import date, timedelta
+from functools import lru_cache
+
+
+@lru_cache(maxsize=64)
+def _every_7th(nbits):
+    # единицы в позициях 0, 7, 14, ... — маска одного дня недели
+    return int("0000001" * (nbits // 7 + 1), 2)
+
+
+def _runs(bits):
+    # длины серий подряд идущих единиц
+    runs = []
+    while bits:
+        bits >>= (bits & -bits).bit_length() - 1
+        length = (~bits & (bits + 1)).bit_length() - 1
+        runs.append(length)
+        bits >>= length
+    return runs
+
+
+class HabitHistory:
+    # История привычки как битовая карта: бит i — день origin + i.
+    # Годы истории — это несколько сотен бит в одном int.
+    __slots__ = ("origin", "bits", "days")
+
+    def __init__(self, origin, bits=0, days=0):
+        self.origin = origin
+        self.bits = bits
+        self.days = days
+
+    @classmethod
+    def from_dates(cls, dates, today=None):
+        dates = [date.fromisoformat(d) if isinstance(d, str) else d for d in dates]
+        today = today or date.today()
+        origin = min(dates, default=today)
+
+        bits = 0
+        for d in dates:
+            bits |= 1 << (d - origin).days
+
+        return cls(origin, bits, (max(today, max(dates, default=today)) - origin).days + 1)
+
+    @classmethod
+    def from_bitmap(cls, origin, data, days):
+        # data — little-endian байты, как их хранит Postgres (get_bit/set_bit у bytea)
+        return cls(origin, int.from_bytes(data, "little"), days)
+
+    @classmethod
+    def from_parts(cls, years, dates, today=None):
+        # years — [(год, bytea из habit_log_years)], dates — отметки из habit_logs
+        history = cls.from_dates(dates, today)
+        for year, data in years:
+            origin = date(year, 1, 1)
+            history.merge(cls.from_bitmap(origin, data, (date(year + 1, 1, 1) - origin).days))
+        return history
+
+    def merge(self, other):
+        origin = min(self.origin, other.origin)
+        end = max(self.origin + timedelta(days=self.days), other.origin + timedelta(days=other.days))
+        self.bits = self.bits << (self.origin - origin).days | other.bits << (other.origin - origin).days
+        self.origin = origin
+        self.days = (end - origin).days
+
+    def to_bytes(self):
+        return self.bits.to_bytes((self.days + 7) // 8, "little")
+
+    def _offset(self, day):
+        return (day - self.origin).days
+
+    def __contains__(self, day):
+        offset = self._offset(day)
+        return offset >= 0 and bool(self.bits >> offset & 1)
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def first_day(self):
+        if not self.bits:
+            return None
+        return self.origin + timedelta(days=(self.bits & -self.bits).bit_length() - 1)
+
+    def add(self, day):
+        offset = self._offset(day)
+        if offset < 0:
+            self.bits <<= -offset
+            self.origin = day
+            self.days -= offset
+            offset = 0
+        self.bits |= 1 << offset
+        self.days = max(self.days, offset + 1)
+
+    def window(self, start, end):
+        # 0/1 за каждый день отрезка [start, end]
+        n = (end - start).days + 1
+        offset = self._offset(start)
+        chunk = self.bits >> offset if offset >= 0 else self.bits << -offset
+        chunk &= (1 << n) - 1
+        return [chunk >> i & 1 for i in range(n)]
+
+    def count(self, start, end):
+        lo = max(self._offset(start), 0)
+        hi = self._offset(end) + 1
+        if hi <= lo:
+            return 0
+        return (self.bits >> lo & ((1 << (hi - lo)) - 1)).bit_count()
+
+    def current_streak(self, today=None):
+        today = today or date.today()
+        end = self._offset(today)
+        if end < 0:
+            return 0
+        # серия не прервана, если сегодня ещё не отмечено, но было вчера
+        if not self.bits >> end & 1:
+            end -= 1
+        if end < 0:
+            return 0
+
+        mask = (1 << (end + 1)) - 1
+        zeros = ~self.bits & mask
+        return end + 1 if not zeros else end - zeros.bit_length() + 1
+
+    def longest_streak(self):
+        x, n = self.bits, 0
+        while x:
+            x &= x << 1
+            n += 1
+        return n
+
+    def streaks(self):
+        return _runs(self.bits)
+
+    def streak_count(self):
+        # начало серии — единица, перед которой ноль
+        return (self.bits & ~(self.bits << 1)).bit_count()
+
+    def weekday_counts(self):
+        # [0] = понедельник
+        mask = _every_7th(self.days)
+        first = self.origin.weekday()
+        return [
+            (self.bits & (mask << ((wd - first) % 7))).bit_count()
+            for wd in range(7)
+        ]
+
+    def completion_rate(self, days=30, today=None):
+        today = today or date.today()
+        start = max(today - timedelta(days=days - 1), self.origin)
+        total_days = (today - start).days + 1
+        return self.count(start, today) / total_days if total_days > 0 else 0.0
+
+    def to_array(self):
+        import numpy as np
+
+        raw = np.frombuffer(self.to_bytes(), dtype=np.uint8)
+        return np.unpackbits(raw, bitorder="little")[:self.days].astype(bool)
+
+    def rolling_rates(self, window=7):
+        # доля выполненных дней в скользящем окне, по дню на элемент
+        import numpy as np
+
+        done = self.to_array().astype(np.int32)
+        csum = np.concatenate(([0], np.cumsum(done)))
+        idx = np.arange(1, self.days + 1)
+        lo = np.maximum(idx - window, 0)
+        return (csum[idx] - csum[lo]) / (idx - lo)
+
+    def calendar(self, weeks=53, today=None):
+        # сетка weeks x 7 для тепловой карты, строки начинаются с понедельника
+        import numpy as np
+
+        today = today or date.today()
+        end = today + timedelta(days=6 - today.weekday())
+        start = end - timedelta(days=weeks * 7 - 1)
+        return np.array(self.window(start, end), dtype=bool).reshape(weeks, 7)
+
+    def analyze(self, today=None):
+        runs = self.streak_count()
+        weekdays = self.weekday_counts()
+        total = len(self)
+
+        return {
+            "total": total,
+            "best_weekday": max(range(7), key=weekdays.__getitem__) if total else None,
+            "worst_weekday": min(range(7), key=weekdays.__getitem__) if total else None,
+            "avg_streak": total / runs if runs else 0.0,
+            "max_streak": self.longest_streak(),
+            "current_streak": self.current_streak(today),
+        }
+
+
+def analyze_many(logs, today=None, window=30):
+    # logs: {habit_id: [даты]} -> {habit_id: статистика}.
+    # Все истории укладываются в одну матрицу habits x days,
+    # поэтому суммы по дням недели и проценты считаются разом в NumPy.
+    import numpy as np
+
+    today = today or date.today()
+    histories = {hid: HabitHistory.from_dates(dates, today) for hid, dates in logs.items()}
+    if not histories:
+        return {}
+
+    origin = min(h.origin for h in histories.values())
+    days = (today - origin).days + 1
+    matrix = np.zeros((len(histories), days), dtype=bool)
+
+    for row, h in enumerate(histories.values()):
+        shift = (h.origin - origin).days
+        arr = h.to_array()[:days - shift]
+        matrix[row, shift:shift + len(arr)] = arr
+
+    weekday_of = (np.arange(days) + origin.weekday()) % 7
+    weekdays = np.stack([matrix[:, weekday_of == wd].sum(axis=1) for wd in range(7)], axis=1)
+    recent = matrix[:, -window:].sum(axis=1)
+
+    result = {}
+    for row, (hid, h) in enumerate(histories.items()):
+        span = min(window, (today - h.origin).days + 1)
+        result[hid] = {
+            **h.analyze(today),
+            "weekdays": weekdays[row].tolist(),
+            "completion_rate": float(recent[row]) / span if span > 0 else 0.0,
+        }
+
+    return result
+
 
 def analyze_logs(dates):
-    weekdays = Counter(d.weekday() for d in dates)
-    streaks = []
-    current = 1
-
-    for i in range(1, len(dates)):
-        if dates[i] == dates[i-1] + timedelta(days=1):
-            current += 1
-        else:
-            streaks.append(current)
-            current = 1
-    streaks.append(current)
-
-    return {
-        "total": len(dates),
-        "best_weekday": weekdays.most_common(1)[0][0],
-        "worst_weekday": weekdays.most_common()[-1][0],
-        "avg_streak": sum(streaks) / len(streaks),
-        "max_streak": max(streaks)
-    }
+    return HabitHistory.from_dates(dates).analyze()
@@ -0,0 +1,164 @@
+import copy
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Статика мини-аппа целиком в памяти: читается при старте, сжимается
+# один раз (gzip, brotli если установлен) и отдаётся без обращений к диску.
+# Файлы, на которые ссылается HTML, получают адрес с хэшем содержимого
+# (app.js -> app.1a2b3c4d.js) и кэшируются браузером навсегда;
+# сам HTML — no-cache, повторный визит обходится ответом 304.
+
+COMPRESS_MIN_SIZE = 256
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+HTML_CACHE = "no-cache"
+HASHED_CACHE = "public, max-age=31536000, immutable"
+
+# src="app.js", href="style.css" — только относительные имена без схемы и пути
+LOCAL_REF = re.compile(r'(src|href)="([\w.-]+)"')
+
+
+class Asset:
+    __slots__ = ("path", "content_type", "cache_control", "etag", "variants", "mtime")
+
+    def __init__(self, path, body, content_type, cache_control, mtime):
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.mtime = mtime
+
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        # кодировка -> (тело, ETag); у каждого варианта свой сильный ETag
+        self.variants = {"identity": (body, self.etag)}
+
+        if len(body) >= COMPRESS_MIN_SIZE and content_type.startswith(COMPRESSIBLE):
+            packed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(packed) < len(body):
+                self.variants["gzip"] = (packed, f'"{digest}-gz"')
+            if brotli is not None:
+                packed = brotli.compress(body, quality=11)
+                if len(packed) < len(body):
+                    self.variants["br"] = (packed, f'"{digest}-br"')
+
+    @property
+    def digest(self):
+        return self.etag.strip('"')[:8]
+
+    def pick(self, accept_encoding):
+        # самый компактный из вариантов с наибольшим q; q=0 — кодировка запрещена
+        accepted = _accepted_encodings(accept_encoding)
+        best, best_q = "identity", 0.0
+        for encoding in ("br", "gzip"):
+            q = accepted.get(encoding, accepted.get("*", 0.0))
+            if encoding in self.variants and q > best_q:
+                best, best_q = encoding, q
+        return best
+
+    def etags(self):
+        return [etag for _, etag in self.variants.values()]
+
+
+def _accepted_encodings(header):
+    # "br;q=1.0, gzip;q=0.5, *;q=0" -> {"br": 1.0, "gzip": 0.5, "*": 0.0}
+    accepted = {}
+    for item in (header or "").lower().split(","):
+        encoding, *params = [part.strip() for part in item.split(";")]
+        if not encoding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[encoding] = q
+    return accepted
+
+
+def _content_type(path):
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if content_type.startswith(("text/", "application/javascript")):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+class AssetStore:
+    # mounts: {url-префикс: каталог}, например {"/miniapp/": "miniapp"};
+    # index.html каталога отдаётся по самому префиксу
+    def __init__(self, mounts, files=(), reload=False):
+        self.mounts = mounts
+        # отдельные файлы: {url: путь}
+        self.files = dict(files)
+        self.reload = reload
+        self.assets = {}
+
+    def _sources(self):
+        sources = dict(self.files)
+        for prefix, root in self.mounts.items():
+            for name in sorted(os.listdir(root)):
+                path = os.path.join(root, name)
+                if os.path.isfile(path) and not name.startswith(".") and not name.endswith(".py"):
+                    url = prefix if name == "index.html" else prefix + name
+                    sources[url] = path
+        return sources
+
+    def load(self):
+        sources = self._sources()
+        assets = {}
+        hashed = {}
+
+        # сначала всё, кроме HTML: HTML ссылается на них по хэшированным адресам
+        for url, path in sorted(sources.items(), key=lambda s: s[1].endswith(".html")):
+            with open(path, "rb") as f:
+                body = f.read()
+            mtime = os.path.getmtime(path)
+            content_type = _content_type(path)
+
+            if path.endswith(".html"):
+                base = url if url.endswith("/") else url.rsplit("/", 1)[0] + "/"
+                body = LOCAL_REF.sub(lambda m: self._link(m, base, hashed), body.decode()).encode()
+                assets[url] = Asset(path, body, content_type, HTML_CACHE, mtime)
+                continue
+
+            asset = Asset(path, body, content_type, HTML_CACHE, mtime)
+            assets[url] = asset
+            stem, ext = os.path.splitext(url)
+            versioned = f"{stem}.{asset.digest}{ext}"
+            # те же сжатые тела, другой Cache-Control
+            assets[versioned] = copy.copy(asset)
+            assets[versioned].cache_control = HASHED_CACHE
+            hashed[url] = versioned
+
+        self.assets = assets
+        return len(sources)
+
+    @staticmethod
+    def _link(match, base, hashed):
+        attr, name = match.groups()
+        return f'{attr}="{hashed.get(base + name, name)}"'
+
+    def _stale(self):
+        for asset in self.assets.values():
+            try:
+                if os.path.getmtime(asset.path) != asset.mtime:
+                    return True
+            except OSError:
+                return True
+        return set(self._sources().values()) != {a.path for a in self.assets.values()}
+
+    def get(self, url):
+        # в dev-режиме (ASSETS_RELOAD) перечитываем, если файлы поменялись на диске
+        if self.reload and self._stale():
+            self.load()
+        return self.assets.get(url)
@@ -1,20 +1,54 @@
-import matplotlib.pyplot as plt
+from io import BytesIO
 from datetime import date, timedelta
-import tempfile
 
-def habit_progress_chart(title, dates):
-    today = date.today()
-    days = [today - timedelta(days=i) for i in reversed(range(30))]
-    values = [1 if str(d) in dates else 0 for d in days]
+from utils.analytics import HabitHistory
+
+# только объектный API + Agg: без глобального состояния pyplot,
+# поэтому функции безопасно вызывать в процессах пула.
+# matplotlib импортируется внутри функций: бот ссылается на них при старте,
+# а сама библиотека (~0.8 с импорта) нужна только процессам пула.
+
+
+def _figure(**kwargs):
+    from matplotlib.figure import Figure
+
+    return Figure(**kwargs)
+
+
+def _to_png(fig):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
 
-    plt.figure()
-    plt.plot(days, values)
-    plt.ylim(0, 1.2)
-    plt.title(title)
-    plt.grid(True)
+    FigureCanvasAgg(fig)
+    buf = BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
 
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    plt.savefig(tmp.name)
-    plt.close()
 
-    return tmp.name
+def warm_up():
+    # импорт заранее в процессе пула, чтобы первый график не ждал его
+    import matplotlib.figure
+    import matplotlib.backends.backend_agg
+
+
+def activity_chart(labels, counts, title):
+    fig = _figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.plot(labels, counts, marker="o")
+    ax.set_title(title)
+    ax.grid(True)
+    return _to_png(fig)
+
+
+def habit_progress_chart(title, dates):
+    today = date.today()
+    start = today - timedelta(days=29)
+    days = [start + timedelta(days=i) for i in range(30)]
+    values = HabitHistory.from_dates(dates, today).window(start, today)
+
+    fig = _figure()
+    ax = fig.subplots()
+    ax.plot(days, values)
+    ax.set_ylim(0, 1.2)
+    ax.set_title(title)
+    ax.grid(True)
+    return _to_png(fig)
@@ -0,0 +1,194 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from config import METRICS_ENABLED
+
+# Метрики в текстовом формате Prometheus без внешних зависимостей.
+# При METRICS_ENABLED=0 все observe/inc/set сразу возвращаются.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+        _registry.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        if METRICS_ENABLED:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        return [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in self.values.items()]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), func=None):
+        super().__init__(name, help, labels)
+        # func() -> {label_values: value}, считается в момент выгрузки
+        self.func = func
+
+    def set(self, value, *labels):
+        if METRICS_ENABLED:
+            self.values[labels] = value
+
+    def render(self):
+        values = self.func() if self.func else self.values
+        return [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in values.items()]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+        series = self.values.get(labels)
+        if series is None:
+            # [счётчики по корзинам..., сумма, количество]
+            series = self.values[labels] = [0] * len(self.buckets) + [0.0, 0]
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        if not METRICS_ENABLED:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self):
+        lines = []
+        for k, series in self.values.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, k, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, k, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, k)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, k)} {series[-1]}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        body = metric.render()
+        if body:
+            lines += metric.header() + body
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ---------- общие метрики ----------
+
+HANDLER_SECONDS = Histogram(
+    "habits_bot_handler_seconds", "Время обработки апдейта хендлером бота", ["handler"]
+)
+DB_QUERY_SECONDS = Histogram(
+    "habits_db_query_seconds", "Время выполнения SQL-запроса", ["query"]
+)
+TELEGRAM_SECONDS = Histogram(
+    "habits_telegram_request_seconds", "Время исходящего вызова Bot API", ["method", "outcome"]
+)
+TELEGRAM_RETRIES = Counter(
+    "habits_telegram_retries_total", "Повторы исходящих вызовов Bot API", ["reason"]
+)
+LLM_SECONDS = Histogram(
+    "habits_llm_request_seconds", "Время запроса к LLM", ["outcome"]
+)
+ERRORS = Counter(
+    "habits_errors_total", "Ошибки по источникам", ["source"]
+)
+SCHEDULER_LAG = Gauge(
+    "habits_scheduler_lag_seconds", "Опоздание последнего запуска задачи планировщика", ["job"]
+)
+
+
+def _pool_usage():
+    import database
+
+    pool = database.pool
+    if pool is None:
+        return {}
+    size, idle = pool.get_size(), pool.get_idle_size()
+    return {("busy",): size - idle, ("idle",): idle, ("max",): pool.get_max_size()}
+
+
+DB_POOL = Gauge(
+    "habits_db_pool_connections", "Соединения пула Postgres", ["state"], func=_pool_usage
+)
+
+
+def query_label(query):
+    # SQL в репозитории статичен, так что первые слова запроса — ограниченный набор меток
+    return " ".join(query.split())[:60]
+
+
+def log_query(record):
+    # query logger asyncpg, вешается на каждое соединение пула
+    DB_QUERY_SECONDS.observe(record.elapsed, query_label(record.query))
+    if record.exception is not None:
+        ERRORS.inc("db")
+
+
+async def serve(port, host="0.0.0.0"):
+    # отдельный /metrics для процесса бота; aiohttp приезжает вместе с aiogram
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(body=render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
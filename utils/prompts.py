@@ -1,6 +1,9 @@
 
+DAYS = ["Понедельник","Вторник","Среда","Четверг","Пятница","Суббота","Воскресенье"]
+
+
 def habit_analysis_prompt(name, stats):
-    days = ["Понедельник","Вторник","Среда","Четверг","Пятница","Суббота","Воскресенье"]
+    days = DAYS
 
     return f"""
 Ты коуч по привычкам.
@@ -8,8 +11,34 @@ def habit_analysis_prompt(name, stats):
 
 Привычка: {name}
 Всего выполнений: {stats['total']}
-Лучший день: {days[stats['best_weekday']]}
-Худший день: {days[stats['worst_weekday']]}
+Лучший день: {days[stats['best_weekday']] if stats['best_weekday'] is not None else "—"}
+Худший день: {days[stats['worst_weekday']] if stats['worst_weekday'] is not None else "—"}
 Средний streak: {stats['avg_streak']:.1f}
 Максимальный streak: {stats['max_streak']}
 """
+
+
+def habit_stats_line(h):
+    line = (
+        f"- {h['title']}: серия {h['current_streak']} дн., "
+        f"рекорд {h['longest_streak']} дн., "
+        f"выполнено {h['completion_rate']:.0%} дней за месяц"
+    )
+    if h["total"]:
+        best = max(range(7), key=lambda i: h["weekdays"][i])
+        line += f", чаще всего — {DAYS[best].lower()}"
+    return line
+
+
+def habits_summary_prompt(habits):
+    # habits — строки repository.fetch_habit_stats
+    summary = "\n".join(habit_stats_line(h) for h in habits)
+
+    return f"""
+Ты коуч по привычкам.
+
+Привычки пользователя:
+{summary}
+
+Дай краткий анализ и 2 практических совета.
+"""
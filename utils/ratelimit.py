@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from utils.cache import LRUCache
+
+
+class TokenBucket:
+    # rate токенов в секунду, не больше burst подряд.
+    # Считаем по GCRA: каждый acquire() сразу бронирует себе слот во времени,
+    # так что ждущие проходят строго в порядке вызова и без блокировок.
+    __slots__ = ("interval", "tolerance", "tat")
+
+    def __init__(self, rate, burst=1):
+        self.interval = 1 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.tat = 0.0
+
+    def reserve(self):
+        # сколько секунд подождать до своего слота
+        now = time.monotonic()
+        tat = max(self.tat, now)
+        self.tat = tat + self.interval
+        return max(0.0, tat - self.tolerance - now)
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        # сервер попросил подождать (RetryAfter) — сдвигаем все слоты
+        self.tat = max(self.tat, time.monotonic() + seconds)
+
+
+class RateLimiter:
+    # общий лимит бота и отдельный для каждого чата; rate 0 — без ограничения
+    def __init__(self, global_rate, chat_rate, chat_burst=1, max_chats=10000):
+        self.global_bucket = TokenBucket(global_rate, burst=max(1, int(global_rate))) if global_rate else None
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        # давно молчавший чат вытесняется — его корзина всё равно была бы полной
+        self.chats = LRUCache(max_chats)
+
+    def chat(self, chat_id):
+        bucket = self.chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chats.set(chat_id, bucket)
+        return bucket
+
+    async def acquire(self, chat_id=None):
+        # сначала очередь чата, потом общая: иначе общий слот
+        # простаивал бы, пока ждём свой чат
+        if chat_id is not None and self.chat_rate:
+            await self.chat(chat_id).acquire()
+        if self.global_bucket is not None:
+            await self.global_bucket.acquire()
+
+    def pause(self, chat_id, seconds):
+        # False — ставить паузу некуда, ждать придётся самому
+        if chat_id is not None and self.chat_rate:
+            self.chat(chat_id).pause(seconds)
+        elif self.global_bucket is not None:
+            self.global_bucket.pause(seconds)
+        else:
+            return False
+        return True
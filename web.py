@@ -1,16 +1,74 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
-from fastapi.middleware.cors import CORSMiddleware
-import asyncpg
+import hashlib
+import hmac
+import asyncio
+import json
 import os
-from datetime import date, timedelta
+import signal
+from contextlib import asynccontextmanager
 
-DATABASE_URL = os.getenv("DATABASE_URL")
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from fastapi.middleware.cors import CORSMiddleware
+
+from config import (
+    DATABASE_URL,
+    HABITS_CACHE_SIZE,
+    HABITS_CACHE_TTL,
+    METRICS_ENABLED,
+    BOT_MODE,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    ASSETS_RELOAD,
+    EVENTS_ENABLED,
+    EVENTS_HEARTBEAT,
+)
+from database import init_pool, close_pool, get_db
+import repository
+import transfer
+from services.events import ChangeFeed
+from utils.assets import AssetStore
+from utils.cache import LRUCache
+from utils import metrics
 
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL is not set")
 
-app = FastAPI()
+BATCH_MAX_OPS = 100
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+assets = AssetStore(
+    {"/miniapp/": os.path.join(BASE_DIR, "miniapp")},
+    files={"/": os.path.join(BASE_DIR, "index.html")},
+    reload=ASSETS_RELOAD,
+)
+
+# модуль bot.py, если бот работает в этом же процессе (BOT_MODE=webhook)
+telegram = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global telegram
+    assets.load()
+    await init_pool()
+    if EVENTS_ENABLED:
+        await feed.start()
+        close_streams_on_exit()
+
+    if BOT_MODE == "webhook":
+        import bot as telegram
+        await telegram.startup()
+
+    yield
+
+    if telegram is not None:
+        await telegram.shutdown()
+    await feed.stop()
+    await close_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,17 +77,132 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ---------- DB ----------
+# ---------- UI ----------
 
-async def get_db():
-    return await asyncpg.connect(DATABASE_URL)
+def asset_response(request: Request, url):
+    asset = assets.get(url)
+    if asset is None:
+        return Response(status_code=404)
 
-# ---------- UI ----------
+    encoding = asset.pick(request.headers.get("accept-encoding"))
+    body, etag = asset.variants[encoding]
+    headers = {"ETag": etag, "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+
+    if any(etag_matches(request, tag) for tag in asset.etags()):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=asset.content_type, headers=headers)
+
+@app.get("/")
+async def index(request: Request):
+    return asset_response(request, "/")
+
+@app.get("/miniapp/")
+async def miniapp_index(request: Request):
+    return asset_response(request, "/miniapp/")
+
+@app.get("/miniapp/{name}")
+async def miniapp_asset(name: str, request: Request):
+    return asset_response(request, "/miniapp/" + name)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    if not METRICS_ENABLED:
+        return Response(status_code=404)
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# ---------- TELEGRAM WEBHOOK ----------
+
+@app.post(WEBHOOK_PATH)
+async def telegram_webhook(request: Request):
+    if telegram is None:
+        return Response(status_code=404)
+
+    secret = request.headers.get("x-telegram-bot-api-secret-token", "")
+    if not hmac.compare_digest(secret, WEBHOOK_SECRET):
+        return Response(status_code=403)
+
+    from aiogram import types
+
+    update = types.Update.to_object(await request.json())
+
+    # ответ уходит, как только апдейт в очереди; при полных очередях
+    # ждём, и Telegram сам притормаживает доставку
+    await telegram.shards.submit(update)
+    return Response(status_code=200)
+
+# ---------- CACHE ----------
+
+# telegram_id -> (etag, готовое JSON-тело списка привычек)
+habits_cache = LRUCache(HABITS_CACHE_SIZE, ttl=HABITS_CACHE_TTL)
+
+
+async def load_habits(telegram_id):
+    cached = habits_cache.get(telegram_id)
+    if cached is not None:
+        return cached
+
+    async with get_db() as db:
+        rows = await repository.fetch_habits(db, telegram_id)
 
-@app.get("/", response_class=HTMLResponse)
-async def index():
-    with open("index.html", "r", encoding="utf-8") as f:
-        return f.read()
+    return cache_habits(telegram_id, rows)
+
+
+def cache_habits(telegram_id, rows):
+    body = json.dumps([dict(r) for r in rows], ensure_ascii=False).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+    habits_cache.set(telegram_id, (etag, body))
+    return etag, body
+
+
+def invalidate_habits(telegram_id):
+    if telegram_id:
+        habits_cache.pop(int(telegram_id))
+
+# ---------- CHANGE FEED ----------
+
+# изменения привычек из любого процесса (бот, другие реплики) — NOTIFY из
+# триггера на habits, см. migrations/005_habit_events.sql
+feed = ChangeFeed()
+
+
+@feed.on_change
+def drop_cached_habits(telegram_id, event):
+    if telegram_id is None:
+        habits_cache.clear()
+    else:
+        invalidate_habits(telegram_id)
+
+
+def close_streams_on_exit():
+    # uvicorn по сигналу сначала ждёт закрытия всех соединений и только потом
+    # завершает lifespan, а SSE-поток сам не кончается — закрываем их сразу
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue
+
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(feed.close_all)
+            previous(signum, frame)
+
+        signal.signal(sig, handler)
+
+
+def sse(event):
+    return f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+def etag_matches(request: Request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return etag in tags or "*" in tags
 
 # ---------- API ----------
 
@@ -39,18 +212,58 @@ async def habits(data: dict):
     if not telegram_id:
         return []
 
-    db = await get_db()
-
-    rows = await db.fetch("""
-        SELECT h.id, h.title, h.streak
-        FROM habits h
-        JOIN users u ON u.id = h.user_id
-        WHERE u.telegram_id=$1 AND h.is_active=TRUE
-        ORDER BY h.id
-    """, telegram_id)
-
-    await db.close()
-    return [dict(r) for r in rows]
+    _, body = await load_habits(int(telegram_id))
+    return Response(body, media_type="application/json")
+
+@app.get("/api/habits")
+async def habits_get(telegram_id: int, request: Request):
+    etag, body = await load_habits(telegram_id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/api/events")
+async def events(telegram_id: int):
+    # Server-Sent Events: {"op": "upsert" | "delete", "habit": {...}} или {"op": "reload"}
+    if not EVENTS_ENABLED:
+        return Response(status_code=404)
+
+    async def stream():
+        # подписка внутри генератора: finally отпишет и при раннем обрыве
+        queue = feed.subscribe(telegram_id)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                yield sse(event)
+        finally:
+            feed.unsubscribe(telegram_id, queue)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=headers)
+
+@app.get("/api/export")
+async def export(telegram_id: int, format: str = "csv"):
+    # поток кусками по мере чтения курсора: память не растёт с историей
+    if format not in transfer.CONTENT_TYPES:
+        return Response(status_code=400)
+
+    async def stream():
+        async with get_db() as db:
+            async for chunk in transfer.export_chunks(db, format, telegram_id):
+                yield chunk
+
+    headers = {"Content-Disposition": f'attachment; filename="habits-{telegram_id}.{format}"'}
+    return StreamingResponse(stream(), media_type=transfer.CONTENT_TYPES[format], headers=headers)
 
 @app.post("/api/add")
 async def add_habit(data: dict):
@@ -60,24 +273,14 @@ async def add_habit(data: dict):
     if not telegram_id or len(title) < 2:
         return {"ok": False}
 
-    db = await get_db()
+    async with get_db() as db:
+        habit = await repository.add_habit(db, telegram_id, title)
 
-    user = await db.fetchrow(
-        "SELECT id FROM users WHERE telegram_id=$1",
-        telegram_id
-    )
-
-    if not user:
-        await db.close()
+    if not habit:
         return {"ok": False}
 
-    await db.execute(
-        "INSERT INTO habits (user_id, title) VALUES ($1, $2)",
-        user["id"], title
-    )
-
-    await db.close()
-    return {"ok": True}
+    invalidate_habits(telegram_id)
+    return {"ok": True, "habit": dict(habit)}
 
 @app.post("/api/done")
 async def done(data: dict):
@@ -85,41 +288,18 @@ async def done(data: dict):
     if not habit_id:
         return {"ok": False}
 
-    today = date.today()
-    db = await get_db()
-
-    habit = await db.fetchrow(
-        "SELECT streak, last_completed FROM habits WHERE id=$1",
-        habit_id
-    )
+    async with get_db() as db:
+        result = await repository.complete_habit(db, habit_id)
 
-    if not habit:
-        await db.close()
+    if not result:
         return {"ok": False}
 
-    # уже отмечено сегодня
-    if habit["last_completed"] == today:
-        await db.close()
-        return {"ok": True}
-
-    streak = (
-        habit["streak"] + 1
-        if habit["last_completed"] == today - timedelta(days=1)
-        else 1
-    )
-
-    await db.execute(
-        "UPDATE habits SET streak=$1, last_completed=$2 WHERE id=$3",
-        streak, today, habit_id
-    )
-
-    await db.execute(
-        "INSERT INTO habit_logs (habit_id, date) VALUES ($1, $2)",
-        habit_id, today
-    )
-
-    await db.close()
-    return {"ok": True}
+    invalidate_habits(result["telegram_id"])
+    return {
+        "ok": True,
+        "created": result["created"],
+        "habit": {"id": result["id"], "title": result["title"], "streak": result["streak"]},
+    }
 
 @app.post("/api/delete")
 async def delete(data: dict):
@@ -127,11 +307,62 @@ async def delete(data: dict):
     if not habit_id:
         return {"ok": False}
 
-    db = await get_db()
-    await db.execute(
-        "UPDATE habits SET is_active=FALSE WHERE id=$1",
-        habit_id
-    )
-    await db.close()
+    async with get_db() as db:
+        telegram_id = await repository.delete_habit(db, habit_id)
+
+    invalidate_habits(telegram_id)
+    return {"ok": telegram_id is not None, "habit_id": habit_id}
+
+@app.post("/api/batch")
+async def batch(data: dict):
+    # {"telegram_id": 1, "ops": [{"op": "done", "habit_id": 5}, {"op": "add", "title": "..."}]}
+    telegram_id = data.get("telegram_id")
+    ops = data.get("ops") or []
+
+    if not telegram_id or not isinstance(ops, list) or len(ops) > BATCH_MAX_OPS:
+        return {"ok": False}
 
-    return {"ok": True}
+    telegram_id = int(telegram_id)
+    results = []
+
+    async with get_db() as db:
+        async with db.transaction():
+            own_ids = {r["id"] for r in await repository.fetch_habits(db, telegram_id)}
+
+            for op in ops:
+                # мусор вместо операции — отказ по ней, а не 500 посреди транзакции
+                if not isinstance(op, dict):
+                    results.append({"ok": False})
+                    continue
+                kind = op.get("op")
+                habit_id = op.get("habit_id")
+
+                if kind == "add":
+                    title = op.get("title")
+                    title = title.strip() if isinstance(title, str) else ""
+                    habit = await repository.add_habit(db, telegram_id, title) if len(title) >= 2 else None
+                    results.append({"ok": habit is not None, "habit": dict(habit) if habit else None})
+                    if habit:
+                        own_ids.add(habit["id"])
+
+                elif kind in ("done", "delete") and isinstance(habit_id, int) and habit_id in own_ids:
+                    if kind == "done":
+                        result = await repository.complete_habit(db, habit_id)
+                        # own_ids прочитан в начале: привычку могли удалить параллельно
+                        if result is None:
+                            own_ids.discard(habit_id)
+                            results.append({"ok": False})
+                        else:
+                            results.append({"ok": True, "created": result["created"], "streak": result["streak"]})
+                    else:
+                        await repository.delete_habit(db, habit_id)
+                        own_ids.discard(habit_id)
+                        results.append({"ok": True})
+
+                else:
+                    results.append({"ok": False})
+
+            rows = await repository.fetch_habits(db, telegram_id)
+
+    cache_habits(telegram_id, rows)
+    return {"ok": True, "results": results, "habits": [dict(r) for r in rows]}